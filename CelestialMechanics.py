@@ -1,3 +1,9 @@
+import numpy as np
+
+from nbody import NBodySystem
+from eclipse_scanner import scan_eclipses
+from lensing_maps import magnification_map
+
 class CelestialMechanics:
    def __init__(self, G=6.67430e-11):
        self.G = G
@@ -12,6 +18,15 @@ class CelestialMechanics:
        
        return umbra_penumbra(sun_pos, moon_pos, earth_pos)
 
+   def eclipse_windows(self, sun_pos, moon_pos, earth_pos, **options):
+       """
+       Solar and lunar eclipse windows over (T, 3) position series
+
+       Inputs may be arrays, memmaps or .npy paths; options (times, dt,
+       chunk, radii, refine) go to eclipse_scanner.scan_eclipses.
+       """
+       return scan_eclipses(sun_pos, moon_pos, earth_pos, **options)
+
    def mercury_perihelion(self, a, e, M_sun):
        """Calculate Mercury's perihelion precession"""
        def relativity_correction():
@@ -37,3 +52,25 @@ class CelestialMechanics:
            return (u**2 + 2)/(u * np.sqrt(u**2 + 4))
            
        return theta_E, deflection_angle, magnification
+
+   def magnification_map(self, lens_positions, masses=None, **options):
+       """
+       Source-plane magnification map of many point lenses
+
+       Positions are in Einstein radii of a unit mass (theta_E above) and
+       masses in that unit. Options (source_half_width, resolution,
+       rays_per_pixel, kappa_s, gamma, mode='direct'|'grid', workers, ...)
+       go to lensing_maps.magnification_map.
+       """
+       return magnification_map(lens_positions, masses, **options)
+
+   def n_body(self, positions, velocities, masses, force='direct', **options):
+       """
+       Evolvable N-body system using this G
+
+       force: 'direct' (O(N^2)), 'barnes_hut' (octree, O(N log N)) or
+       'parallel' (process pool); options go to nbody.NBodySystem.
+       Advance with .step(dt, 'leapfrog'|'yoshida4') or .run(), which
+       reports steps/sec and energy drift.
+       """
+       return NBodySystem(positions, velocities, masses, G=self.G, force=force, **options)
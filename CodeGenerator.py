@@ -1,8 +1,13 @@
 class MathTextProcessor:
-   def __init__(self):
-       self.sympy = __import__('sympy')
-       self.numpy = __import__('numpy')
-       self.nltk = __import__('nltk')
+   # Loaded on first attribute access, so constructing a processor is free
+   LAZY_MODULES = ('sympy', 'numpy', 'nltk')
+
+   def __getattr__(self, name):
+       if name not in self.LAZY_MODULES:
+           raise AttributeError(name)
+       module = __import__(name)
+       setattr(self, name, module)
+       return module
        
    def parse_text(self, text):
        """Extract mathematical content and convert to code"""
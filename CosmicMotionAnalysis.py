@@ -1,6 +1,11 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import scipy.constants as const
+from rocket_dynamics import integrate_rocket, integrate_batch
+from trajectory_cache import TrajectoryCache
+from orbit_propagation import GM_SUN, TwoBodyPropagator
+from headless_render import Panel, PanelFigure, render_many
+
+# Shared by every CosmicMotionAnalysis; see trajectory_cache for settings
+trajectory_cache = TrajectoryCache()
 
 class CosmicMotionAnalysis:
     """
@@ -13,7 +18,11 @@ class CosmicMotionAnalysis:
         launch_angle=45,     # degrees
         initial_height=0,    # meters
         payload_mass=1000,   # kg
-        fuel_mass=50000      # kg
+        fuel_mass=50000,     # kg
+        model='ballistic',   # 'ballistic' or 'ode'
+        dt=0.1,              # s, output sampling
+        cache=False,         # reuse results for identical arguments
+        **engine
         ):
         """
         Calculate rocket trajectory using simplified physics model
@@ -24,10 +33,60 @@ class CosmicMotionAnalysis:
         initial_height (float): Initial launch height
         payload_mass (float): Mass of payload
         fuel_mass (float): Mass of fuel
+        model (str): 'ballistic' for the closed-form parabola, 'ode' to
+            integrate thrust, drag and variable mass (rocket_dynamics)
+        dt (float): Sampling interval of the returned trajectory
+        cache (bool): Opt in to trajectory_cache, which keeps results in
+            memory and writes them to disk (COSMIC_MOTION_CACHE, default
+            ~/.cache/cosmic_motion). Cached arrays are read-only, and
+            memory-mapped when reloaded from disk
+        engine: Extra integrate_rocket options for the 'ode' model
+            (burn_time, exhaust_velocity, drag_area, method, ...)
         
         Returns:
-        dict: Rocket trajectory characteristics
+        dict: Rocket trajectory characteristics; the 'ode' model also
+        returns event times, a summary and the dense 'solution', whose
+        sample(dt) resamples without re-integrating. The on-disk cache
+        cannot store 'solution': a result reloaded from disk has
+        'solution' set to None
         """
+        if cache:
+            params = dict(
+                initial_velocity=initial_velocity, launch_angle=launch_angle,
+                initial_height=initial_height, payload_mass=payload_mass,
+                fuel_mass=fuel_mass, model=model, dt=dt, **engine
+            )
+            return trajectory_cache.get_or_compute(
+                params,
+                lambda: CosmicMotionAnalysis.rocket_trajectory_calculation(cache=False, **params)
+            )
+
+        initial_conditions = {
+            'initial_velocity': initial_velocity,
+            'launch_angle': launch_angle,
+            'initial_height': initial_height,
+            'payload_mass': payload_mass,
+            'fuel_mass': fuel_mass
+        }
+
+        if model == 'ode':
+            solution = integrate_rocket(
+                initial_velocity, launch_angle, initial_height,
+                payload_mass, fuel_mass, **engine
+            )
+            return {
+                'initial_conditions': initial_conditions,
+                'trajectory': solution.sample(dt),
+                'total_flight_time': solution.flight_time,
+                'events': solution.events,
+                'summary': solution.summary(),
+                'solution': solution
+            }
+        if model != 'ballistic':
+            raise ValueError(f"Unknown trajectory model: {model}")
+
+        import scipy.constants as const
+        
         # Gravitational acceleration
         g = const.g
         
@@ -72,21 +131,63 @@ class CosmicMotionAnalysis:
                 'time': t,
                 'x_position': x,
                 'y_position': y,
-                'masses': [rocket_mass(ti) for ti in t]
+                'masses': rocket_mass(t)
             }
         
         return {
-            'initial_conditions': {
-                'initial_velocity': initial_velocity,
-                'launch_angle': launch_angle,
-                'initial_height': initial_height,
-                'payload_mass': payload_mass,
-                'fuel_mass': fuel_mass
-            },
-            'trajectory': trajectory_points(),
+            'initial_conditions': initial_conditions,
+            'trajectory': trajectory_points(dt),
             'total_flight_time': time_of_flight()
         }
     
+    @staticmethod
+    def rocket_trajectory_sweep(
+        initial_velocity=0,  # m/s, array
+        launch_angle=45,     # degrees, array
+        payload_mass=1000,   # kg, array
+        fuel_mass=50000,     # kg, array
+        **engine
+        ):
+        """
+        Trade study over broadcastable launch parameter arrays
+        
+        All combinations are integrated at once by
+        rocket_dynamics.integrate_batch; engine takes its remaining
+        options (initial_height, burn_time, drag_model, vectorized, ...).
+        
+        Returns:
+        array: Structured array with one row per trajectory, including
+        flight_time, range and apogee columns
+        """
+        return integrate_batch(
+            initial_velocity=initial_velocity, launch_angle=launch_angle,
+            payload_mass=payload_mass, fuel_mass=fuel_mass, **engine
+        )
+    
+    @staticmethod
+    def orbit_ephemeris(positions, velocities, times, mu=GM_SUN, with_velocities=False):
+        """
+        Two-body ephemerides of many bodies on a dense time grid
+        
+        Parameters:
+        positions (array): (B, 3) heliocentric positions at t = 0 (m)
+        velocities (array): (B, 3) velocities at t = 0 (m/s)
+        times (array): (T,) epochs (s)
+        mu (float): Gravitational parameter of the central body
+        with_velocities (bool): Also return velocities
+        
+        Returns:
+        dict: Orbital elements and (B, T, 3) positions (and velocities)
+        """
+        propagator = TwoBodyPropagator(positions, velocities, mu)
+        states = propagator.propagate(times, velocities=with_velocities)
+        result = {'elements': propagator.elements}
+        if with_velocities:
+            result['positions'], result['velocities'] = states
+        else:
+            result['positions'] = states
+        return result
+    
     @staticmethod
     def earth_galactic_rotation():
         """
@@ -95,6 +196,8 @@ class CosmicMotionAnalysis:
         Returns:
         dict: Galactic rotation characteristics
         """
+        import scipy.constants as const
+        
         # Galactic parameters
         galactic_center_distance = 26000  # Light-years
         galactic_rotation_period = 225e6  # years
@@ -156,40 +259,106 @@ class CosmicMotionAnalysis:
             'complex_motion': complex_galactic_motion()
         }
     
-    def visualize_cosmic_motion(self):
+    def visualize_cosmic_motion(self, path=None, panels=None, **params):
         """
         Visualize rocket trajectory and Earth's galactic motion
+        
+        Parameters:
+        path (str): Render headless (Agg) into this image file instead of
+            showing the figure; the figure is kept and only its data is
+            updated on later calls with the same panels
+        panels (list): Panel names to draw (default: all of
+            COSMIC_PANELS); analyses of other panels are skipped
+        params: rocket_trajectory_calculation arguments; cache
+            defaults to True here
         """
-        plt.figure(figsize=(15, 6))
-        
-        # Rocket Trajectory
-        plt.subplot(121)
-        rocket_results = self.rocket_trajectory_calculation()
-        plt.plot(
-            rocket_results['trajectory']['x_position'],
-            rocket_results['trajectory']['y_position']
-        )
-        plt.title('Rocket Trajectory')
-        plt.xlabel('Horizontal Distance (m)')
-        plt.ylabel('Vertical Distance (m)')
+        if path is None:
+            import matplotlib.pyplot as plt
+            
+            figure = PanelFigure(cosmic_panels(panels), layout=(1, 2), figure=plt.figure(figsize=(15, 6)))
+            figure.update(params)
+            plt.show()
+            return
+        if not hasattr(self, '_renderers'):
+            self._renderers = {}
+        key = tuple(panels) if panels is not None else None
+        if key not in self._renderers:
+            self._renderers[key] = PanelFigure(cosmic_panels(panels), figsize=(15, 6))
+        return self._renderers[key].render(params, path)
+    
+    @staticmethod
+    def render_cosmic_motion(param_sets, paths, panels=None, workers=None, **options):
+        """
+        Render many parameter sets to image files without a display
         
-        # Earth Galactic Motion
-        plt.subplot(122)
-        galactic_results = self.earth_galactic_rotation()
+        Parameters:
+        param_sets (list): Dicts of rocket_trajectory_calculation
+            arguments; cache defaults to True here
+        paths (list or str): Output files, or a directory for numbered PNGs
+        panels (list): Panel names to draw (default: all)
+        workers (int): Worker processes (default: serial)
+        options: headless_render.render_many options (dpi, figsize, ...)
         
+        Returns:
+        list: Written paths
+        """
+        options.setdefault('figsize', (15, 6))
+        return render_many(cosmic_panels, param_sets, paths, panels, workers, **options)
+
+
+COSMIC_PANELS = ('rocket', 'galactic')
+
+
+def cosmic_panels(names=None):
+    """
+    Panels of visualize_cosmic_motion
+    
+    Parameters:
+    names (list): Subset of COSMIC_PANELS, in drawing order
+    
+    Returns:
+    list: headless_render.Panel objects
+    """
+    analysis = CosmicMotionAnalysis
+    
+    # Rocket Trajectory
+    def build_rocket(ax):
+        ax.set_title('Rocket Trajectory')
+        ax.set_xlabel('Horizontal Distance (m)')
+        ax.set_ylabel('Vertical Distance (m)')
+        line, = ax.plot([], [])
+        return line
+    
+    def compute_rocket(params, memo):
+        # Dashboards redraw the same parameter sets; reuse trajectories
+        trajectory = analysis.rocket_trajectory_calculation(**{'cache': True, **params})['trajectory']
+        return trajectory['x_position'], trajectory['y_position']
+    
+    # Earth Galactic Motion
+    def build_galactic(ax):
+        ax.set_title('Earth Galactic Motion Components')
+        ax.set_xlabel('Motion Type')
+        ax.set_ylabel('Velocity (km/s)')
+        names = ['galactic_rotation', 'local_group_motion', 'solar_system_peculiar_motion']
+        bars = ax.bar(names, [0] * len(names))
+        ax.tick_params(axis='x', labelrotation=45)
+        return dict(zip(names, bars))
+    
+    def compute_galactic(params, memo):
         # Visualize multiple motion components
-        motion_components = galactic_results['complex_motion']
-        plt.bar(
-            motion_components.keys(), 
-            [v/1000 for v in motion_components.values()]
-        )
-        plt.title('Earth Galactic Motion Components')
-        plt.xlabel('Motion Type')
-        plt.ylabel('Velocity (km/s)')
-        plt.xticks(rotation=45)
-        
-        plt.tight_layout()
-        plt.show()
+        motion_components = analysis.earth_galactic_rotation()['complex_motion']
+        return {name: v / 1000 for name, v in motion_components.items()}
+    
+    def update_galactic(ax, bars, velocities):
+        for name, bar in bars.items():
+            bar.set_height(velocities[name])
+    
+    available = {
+        'rocket': Panel('rocket', build_rocket, compute_rocket,
+                        lambda ax, line, data: line.set_data(*data)),
+        'galactic': Panel('galactic', build_galactic, compute_galactic, update_galactic),
+    }
+    return [available[name] for name in (names or COSMIC_PANELS)]
 
 def main():
     # Create cosmic motion analysis instance
@@ -197,7 +366,7 @@ def main():
     
     # Rocket Trajectory Analysis
     print("Rocket Trajectory Analysis:")
-    rocket_results = cosmic_analysis.rocket_trajectory_calculation()
+    rocket_results = cosmic_analysis.rocket_trajectory_calculation(cache=True)
     print(f"Total Flight Time: {rocket_results['total_flight_time']:.2f} seconds")
     
     # Earth Galactic Rotation Analysis
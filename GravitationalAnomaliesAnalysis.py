@@ -1,8 +1,8 @@
-```python
 import numpy as np
-import sympy as sp
-import matplotlib.pyplot as plt
-import scipy.constants as const
+
+from gw_waveforms import C, G, M_SUN, MPC, ChirpBank, chirp_time
+from headless_render import Panel, PanelFigure, render_many
+import schwarzschild_geodesics
 
 class GravitationalAnomaliesAnalysis:
     """
@@ -17,6 +17,9 @@ class GravitationalAnomaliesAnalysis:
         Returns:
         dict: Schwarzschild metric characteristics
         """
+        import sympy as sp
+        import scipy.constants as const
+        
         # Symbolic setup for metric computation
         r, t, M = sp.symbols('r t M')
         
@@ -68,25 +71,74 @@ class GravitationalAnomaliesAnalysis:
                 'gravitational_redshift': np.log(1 - rs/rs)
             }
         
+        geometry = schwarzschild_geodesics.compiled()
+        
         return {
             'metric_components': metric_components(),
             'schwarzschild_radius_func': schwarzschild_radius,
-            'event_horizon_analysis': event_horizon_properties
+            'event_horizon_analysis': event_horizon_properties,
+            # Compiled once per process, geometric units (G = c = 1)
+            'metric_func': geometry['metric'],
+            'christoffel_func': geometry['christoffel']
         }
     
     @staticmethod
-    def gravitational_wave_simulation():
+    def geodesics(x0, u0, mass=1.0, **options):
+        """
+        Integrate a batch of Schwarzschild geodesics
+        
+        Parameters:
+        x0 (array): (B, 4) initial (t, r, theta, phi), geometric units
+        u0 (array): (B, 4) initial four-velocities (null or timelike)
+        mass (float): Black hole mass M (lengths are in the same unit)
+        options: step, max_steps, r_escape, record_every, ... of
+            schwarzschild_geodesics.integrate_geodesics
+        
+        Returns:
+        dict: Final states, CAPTURED/ESCAPED status and trajectories
+        """
+        return schwarzschild_geodesics.integrate_geodesics(x0, u0, mass, **options)
+    
+    @staticmethod
+    def black_hole_shadow(mass=1.0, **options):
+        """
+        Ray-traced shadow and thin-disk image of a Schwarzschild black hole
+        
+        Parameters:
+        mass (float): Black hole mass M
+        options: r_observer, inclination, fov, resolution, disk, ... of
+            schwarzschild_geodesics.shadow_image
+        
+        Returns:
+        dict: 'captured' shadow mask, 'disk_radius' image, pixel angles
+        and the analytic shadow angle
+        """
+        return schwarzschild_geodesics.shadow_image(mass, **options)
+    
+    @staticmethod
+    def gravitational_wave_simulation(
+        mass1=1.4 * M_SUN,
+        mass2=1.4 * M_SUN,
+        distance=MPC
+    ):
         """
         Simulate gravitational wave propagation
         
+        Parameters:
+        mass1 (float): Mass of first object
+        mass2 (float): Mass of second object
+        distance (float): Distance to source
+        
         Returns:
         dict: Gravitational wave characteristics
         """
+        import scipy.constants as const
+        
         # Gravitational wave parameters
         def wave_generation(
-            mass1=1.4 * const.M_sun,  # Neutron star mass
-            mass2=1.4 * const.M_sun,
-            distance=1e6 * const.parsec  # 1 Mpc
+            mass1=1.4 * M_SUN,  # Neutron star mass
+            mass2=1.4 * M_SUN,
+            distance=MPC  # 1 Mpc
         ):
             """
             Generate gravitational wave model
@@ -140,28 +192,77 @@ class GravitationalAnomaliesAnalysis:
             }
         
         # Time-frequency evolution
-        def wave_propagation():
-            """
-            Simulate wave propagation characteristics
+        def wave_propagation(
+            mass1=1.4 * M_SUN,
+            mass2=1.4 * M_SUN,
+            distance=MPC,
+            f_low=30.0,
+            sample_rate=4096.0
+        ):
             """
-            # Time array
-            t = np.linspace(0, 1, 200)
+            Simulate the inspiral chirp up to coalescence
             
-            # Simulated wave characteristics
-            frequency = 100 * np.sin(2 * np.pi * t)
-            amplitude = 1e-21 * np.exp(-t)
+            Returns:
+            dict: Time grid, strain, leading-order frequency and amplitude
+            envelope of a 3.5PN TaylorF2 template
+            """
+            duration = 2.0**np.ceil(np.log2(chirp_time(mass1, mass2, f_low) + 1))
+            bank = ChirpBank(mass1, mass2, distance, sample_rate=sample_rate,
+                             duration=duration, f_low=f_low,
+                             t_coalescence=duration - 0.5)
+            signal = bank.analytic()[0]
             
             return {
-                'time': t,
-                'frequency': frequency,
-                'amplitude': amplitude
+                'time': bank.times,
+                'strain': signal.real,
+                'frequency': bank.instantaneous_frequency(bank.times),
+                'amplitude': np.abs(signal)
             }
         
         return {
-            'wave_generation': wave_generation(),
-            'wave_propagation': wave_propagation()
+            'wave_generation': wave_generation(mass1, mass2, distance),
+            'wave_propagation': wave_propagation(mass1, mass2, distance)
         }
     
+    @staticmethod
+    def chirp_template_bank(mass1, mass2, distance=MPC, **options):
+        """
+        Post-Newtonian inspiral templates for a bank of sources
+        
+        Parameters:
+        mass1, mass2 (array): Component masses (kg)
+        distance (array): Distances to the sources (m)
+        options: Grid and model settings (sample_rate, duration, f_low,
+            pn_order, t_coalescence, dtype, cache) of gw_waveforms.ChirpBank
+        
+        Returns:
+        ChirpBank: Templates via frequency_domain(), time_domain() or
+        blocks(size)
+        """
+        return ChirpBank(mass1, mass2, distance, **options)
+    
+    @staticmethod
+    def matched_filter_search(strain, bank, psd=None, threshold=8.0, cluster=0.1, **options):
+        """
+        Search strain data for the templates of a bank
+        
+        Parameters:
+        strain (array or str): Strain samples at bank.sample_rate, or the
+            path of a .npy/raw float32 file to memory-map
+        bank (ChirpBank): Templates coalescing at t = 0
+        psd: Noise PSD (estimated from the strain when None)
+        threshold (float): Minimum SNR of a trigger
+        cluster (float): Clustering window in seconds
+        options: block, guard and workers of matched_filter.MatchedFilter
+        
+        Returns:
+        generator: matched_filter.TRIGGER_DTYPE records in time order
+        """
+        from matched_filter import MatchedFilter
+        
+        search = MatchedFilter(bank, psd=psd, **options)
+        return search.filter(strain, threshold=threshold, cluster=cluster)
+    
     @staticmethod
     def quantum_gravity_effects():
         """
@@ -170,6 +271,8 @@ class GravitationalAnomaliesAnalysis:
         Returns:
         dict: Quantum gravity characteristics
         """
+        import scipy.constants as const
+        
         # Planck scale analysis
         def planck_scale_physics():
             """
@@ -217,61 +320,129 @@ class GravitationalAnomaliesAnalysis:
             'quantum_foam': quantum_foam_simulation()
         }
     
-    def visualize_gravitational_phenomena(self):
+    def visualize_gravitational_phenomena(self, path=None, panels=None, **params):
         """
         Visualize gravitational anomalies and spacetime effects
-        """
-        plt.figure(figsize=(15, 10))
         
-        # Schwarzschild Metric Visualization
-        plt.subplot(221)
-        schwarzschild_results = self.schwarzschild_metric()
-        plt.title('Schwarzschild Metric Components')
-        plt.text(0.5, 0.5, 'Spacetime Curvature', 
-                 horizontalalignment='center',
-                 verticalalignment='center')
-        plt.axis('off')
-        
-        # Gravitational Wave Propagation
-        plt.subplot(222)
-        gwave_results = self.gravitational_wave_simulation()
-        plt.plot(
-            gwave_results['wave_propagation']['time'],
-            gwave_results['wave_propagation']['amplitude']
-        )
-        plt.title('Gravitational Wave Amplitude')
-        plt.xlabel('Time')
-        plt.ylabel('Amplitude')
-        
-        # Quantum Gravity Effects
-        plt.subplot(223)
-        quantum_results = self.quantum_gravity_effects()
-        fluctuations = quantum_results['quantum_foam']['spacetime_fluctuations']
-        plt.scatter(
-            fluctuations[:, 0], 
-            fluctuations[:, 1], 
-            alpha=0.5
-        )
-        plt.title('Quantum Foam Fluctuations')
-        plt.xlabel('X Fluctuation')
-        plt.ylabel('Y Fluctuation')
+        Parameters:
+        path (str): Render headless (Agg) into this image file instead of
+            showing the figure; the figure is kept and only its data is
+            updated on later calls with the same panels
+        panels (list): Panel names to draw (default: all of
+            GRAVITATIONAL_PANELS); analyses of other panels are skipped
+        params: Source parameters (mass1, mass2, distance)
+        """
+        if path is None:
+            import matplotlib.pyplot as plt
+            
+            figure = PanelFigure(gravitational_panels(panels), figure=plt.figure(figsize=(15, 10)))
+            figure.update(params)
+            plt.show()
+            return
+        if not hasattr(self, '_renderers'):
+            self._renderers = {}
+        key = tuple(panels) if panels is not None else None
+        if key not in self._renderers:
+            self._renderers[key] = PanelFigure(gravitational_panels(panels))
+        return self._renderers[key].render(params, path)
+    
+    @staticmethod
+    def render_gravitational_phenomena(param_sets, paths, panels=None, workers=None, **options):
+        """
+        Render many parameter sets to image files without a display
         
-        # Planck Scale Characteristics
-        plt.subplot(224)
-        planck_scale = quantum_results['planck_scale']
-        plt.bar(
-            ['Planck Length', 'Planck Mass', 'Planck Time'],
-            [
-                np.log10(planck_scale['planck_length']),
-                np.log10(planck_scale['planck_mass']),
-                np.log10(planck_scale['planck_time'])
-            ]
-        )
-        plt.title('Planck Scale Characteristics (Log Scale)')
-        plt.ylabel('Log10 Value')
+        Parameters:
+        param_sets (list): Dicts of visualize_gravitational_phenomena params
+        paths (list or str): Output files, or a directory for numbered PNGs
+        panels (list): Panel names to draw (default: all)
+        workers (int): Worker processes (default: serial)
+        options: headless_render.render_many options (dpi, figsize, ...)
         
-        plt.tight_layout()
-        plt.show()
+        Returns:
+        list: Written paths
+        """
+        return render_many(gravitational_panels, param_sets, paths, panels, workers, **options)
+
+
+GRAVITATIONAL_PANELS = ('metric', 'wave', 'foam', 'planck')
+
+
+def gravitational_panels(names=None):
+    """
+    Panels of visualize_gravitational_phenomena
+    
+    Parameters:
+    names (list): Subset of GRAVITATIONAL_PANELS, in drawing order
+    
+    Returns:
+    list: headless_render.Panel objects
+    """
+    analysis = GravitationalAnomaliesAnalysis
+    
+    def quantum(params, memo):
+        return memo('quantum', analysis.quantum_gravity_effects)
+    
+    # Schwarzschild Metric Visualization
+    def build_metric(ax):
+        ax.set_title('Schwarzschild Metric Components')
+        ax.axis('off')
+        return ax.text(0.5, 0.5, 'Spacetime Curvature',
+                       horizontalalignment='center',
+                       verticalalignment='center',
+                       transform=ax.transAxes)
+    
+    def compute_metric(params, memo):
+        # Schwarzschild radius of the total mass, without building the
+        # symbolic metric
+        mass = params.get('mass1', 1.4 * M_SUN) + params.get('mass2', 1.4 * M_SUN)
+        return 2 * G * mass / C**2
+    
+    def update_metric(ax, text, rs):
+        text.set_text(f'Spacetime Curvature\nr_s = {rs:.4g} m')
+    
+    # Gravitational Wave Propagation
+    def build_wave(ax):
+        ax.set_title('Gravitational Wave Amplitude')
+        ax.set_xlabel('Time')
+        ax.set_ylabel('Amplitude')
+        line, = ax.plot([], [])
+        return line
+    
+    def compute_wave(params, memo):
+        waves = analysis.gravitational_wave_simulation(**params)['wave_propagation']
+        return waves['time'], waves['amplitude']
+    
+    # Quantum Gravity Effects
+    def build_foam(ax):
+        ax.set_title('Quantum Foam Fluctuations')
+        ax.set_xlabel('X Fluctuation')
+        ax.set_ylabel('Y Fluctuation')
+        return ax.scatter([], [], alpha=0.5)
+    
+    # Planck Scale Characteristics
+    def build_planck(ax):
+        ax.set_title('Planck Scale Characteristics (Log Scale)')
+        ax.set_ylabel('Log10 Value')
+        return ax.bar(['Planck Length', 'Planck Mass', 'Planck Time'], [0, 0, 0])
+    
+    def compute_planck(params, memo):
+        planck_scale = quantum(params, memo)['planck_scale']
+        return [np.log10(planck_scale[key]) for key in ('planck_length', 'planck_mass', 'planck_time')]
+    
+    def update_bars(ax, bars, heights):
+        for bar, height in zip(bars, heights):
+            bar.set_height(height)
+    
+    available = {
+        'metric': Panel('metric', build_metric, compute_metric, update_metric),
+        'wave': Panel('wave', build_wave, compute_wave,
+                      lambda ax, line, data: line.set_data(*data)),
+        'foam': Panel('foam', build_foam,
+                      lambda params, memo: quantum(params, memo)['quantum_foam']['spacetime_fluctuations'][:, :2],
+                      lambda ax, points, offsets: points.set_offsets(offsets)),
+        'planck': Panel('planck', build_planck, compute_planck, update_bars),
+    }
+    return [available[name] for name in (names or GRAVITATIONAL_PANELS)]
 
 def main():
     # Create gravitational anomalies analysis instance
@@ -299,4 +470,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-```
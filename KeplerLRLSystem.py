@@ -1,12 +1,75 @@
+import numpy as np
+
+import symplectic_integrators
+from orbit_propagation import elements_to_state, state_to_elements
+
 class KeplerLRLSystem:
    def __init__(self):
        self.mu = 1.0 # Reduced mass
        self.k = 1.0  # Force constant
        
    def lrl_vector(self, r, p):
-       """Laplace-Runge-Lenz vector A = p × L - μkr/r"""
-       L = np.cross(r, p)
-       return np.cross(p, L) - self.mu * self.k * r/np.linalg.norm(r)
+       """Laplace-Runge-Lenz vector A = p × L - μkr/r, for (..., 3) r and p"""
+       r, p = np.asarray(r, dtype=float), np.asarray(p, dtype=float)
+       L = _cross(r, p)
+       return _cross(p, L) - self.mu * self.k * r / _norm(r)[..., None]
+
+   def invariants(self, r, p, scaled=True):
+       """
+       Conserved quantities at a batch of phase-space points
+
+       Parameters:
+       r, p (array): (..., 3) positions and momenta, e.g. (N, 3) states
+           along a trajectory
+       scaled (bool): Build J± from D = A / sqrt(-2μE), whose brackets
+           close on SO(4) for bound orbits (NaN where E >= 0); False uses
+           A itself, as symmetry_generators does
+
+       Returns:
+       dict: 'L', 'A', 'J_plus', 'J_minus' (..., 3) and 'energy' (...)
+       """
+       r, p = np.asarray(r, dtype=float), np.asarray(p, dtype=float)
+       distance = _norm(r)
+       L = _cross(r, p)
+       A = _cross(p, L)
+       A -= (self.mu * self.k / distance)[..., None] * r
+       energy = np.einsum('...i,...i->...', p, p) / (2 * self.mu) - self.k / distance
+       if scaled:
+           scale = np.full(energy.shape, np.nan)
+           bound = energy < 0
+           scale[bound] = 1 / np.sqrt(-2 * self.mu * energy[bound])
+           D = A * scale[..., None]
+       else:
+           D = A
+       return {
+           'L': L,
+           'A': A,
+           'energy': energy,
+           'J_plus': 0.5 * (L + D),
+           'J_minus': 0.5 * (L - D),
+       }
+
+   def invariant_drift(self, r, p, chunk=1 << 20):
+       """
+       Largest deviation of each invariant from its value at the first point
+
+       r and p are read chunk rows at a time, so (N, 3) memmaps of long
+       integrations stay out of memory.
+
+       Returns:
+       dict: Maximum |X - X_0| over the trajectory for 'L', 'A' and
+       'J_plus'/'J_minus' (vector norms) and 'energy', plus
+       'relative_energy' (|E - E_0| / |E_0|)
+       """
+       reference = self.invariants(r[:1], p[:1])
+       drift = dict.fromkeys(reference, 0.0)
+       for start in range(0, len(r), chunk):
+           values = self.invariants(r[start:start + chunk], p[start:start + chunk])
+           for name, value in values.items():
+               delta = np.abs(value - reference[name]) if value.ndim == 1 else _norm(value - reference[name])
+               drift[name] = max(drift[name], float(np.nanmax(delta, initial=0.0)))
+       drift['relative_energy'] = drift['energy'] / abs(float(reference['energy'][0]))
+       return drift
 
    def poisson_brackets(self):
        """Key Poisson bracket relations:
@@ -39,30 +102,72 @@ class KeplerLRLSystem:
 
    def hamiltonians(self, r, p):
        """Extended phase space Hamiltonians"""
+       # Each accepts (..., 3) arrays and returns (...) values
        def H_kepler(r, p):
-           return p.dot(p)/(2*self.mu) - self.k/np.linalg.norm(r)
+           return _dot(p, p)/(2*self.mu) - self.k/_norm(r)
            
        def H_harmonic(r, p):
-           return p.dot(p)/(2*self.mu) + self.k*r.dot(r)/2
+           return _dot(p, p)/(2*self.mu) + self.k*_dot(r, r)/2
            
        def H_runge_lenz(r, p):
            A = self.lrl_vector(r, p)
-           return -A.dot(A)/(2*self.mu)
+           return -_dot(A, A)/(2*self.mu)
            
        return H_kepler, H_harmonic, H_runge_lenz
 
-   def kepler_laws(self, r, v, t):
-       """Verify Kepler's Laws"""
+   def evolve(self, r, p, dt, steps, scheme='leapfrog', hamiltonian='kepler', **options):
+       """
+       Advance (B, 3) float64 phase-space points in place
+
+       scheme: 'leapfrog', 'forest_ruth', 'yoshida6' or 'yoshida8';
+       hamiltonian: 'kepler' or 'harmonic' (H_runge_lenz is not
+       separable). Options (regularized for KS steps, every and out for
+       decimated samples) go to symplectic_integrators.integrate.
+       """
+       return symplectic_integrators.integrate(r, p, dt, steps, scheme, hamiltonian,
+                                               mu=self.mu, k=self.k, **options)
+
+   def energy(self, r, v):
+       """Total energy μ|v|²/2 - k/r of (..., 3) positions and velocities"""
+       return self.mu * _dot(v, v) / 2 - self.k / _norm(r)
+
+   def orbital_eccentricity(self, r, v):
+       """Eccentricity |A| / μk of (..., 3) positions and velocities"""
+       return _norm(self.lrl_vector(r, self.mu * np.asarray(v, dtype=float))) / (self.mu * self.k)
+
+   def semi_major_axis(self, e, energy):
+       """a = -k / 2E (negative for hyperbolae, infinite for parabolae)"""
+       energy = np.asarray(energy, dtype=float)
+       with np.errstate(divide='ignore'):
+           return -self.k / (2 * energy)
+
+   def orbital_elements(self, r, v, **options):
+       """
+       Classical elements (a, e, i, raan, argp, nu, plus M and the
+       semi-latus rectum p) of (..., 3) positions and velocities
+
+       Options (tol) go to orbit_propagation.state_to_elements; see
+       orbit_propagation.states_to_catalog for chunked conversion of long
+       memory-mapped series.
+       """
+       return state_to_elements(r, v, self.k / self.mu, **options)
+
+   def state_vectors(self, a, e, i, raan, argp, nu, p=None):
+       """Positions and velocities from orbital_elements (pass p near e = 1)"""
+       return elements_to_state(a, e, i, raan, argp, nu, self.k / self.mu, p)
+
+   def kepler_laws(self, r, v, t=None):
+       """Verify Kepler's Laws for (..., 3) positions and velocities"""
        # First law - orbits are conic sections
        e = self.orbital_eccentricity(r, v)
        
        # Second law - equal areas in equal times
-       L = np.cross(r, self.mu*v)
-       dA_dt = np.linalg.norm(L)/(2*self.mu)
+       L = _cross(np.asarray(r, dtype=float), self.mu*np.asarray(v, dtype=float))
+       dA_dt = _norm(L)/(2*self.mu)
        
-       # Third law - T^2 ∝ a^3
+       # Third law - T^2 ∝ a^3 (NaN for unbound orbits)
        a = self.semi_major_axis(e, self.energy(r, v))
-       T = 2*np.pi*np.sqrt(a**3/(self.k/self.mu))
+       T = 2*np.pi*np.sqrt(np.where(a > 0, a, np.nan)**3/(self.k/self.mu))
        
        return e, dA_dt, T
 
@@ -81,3 +186,21 @@ class KeplerLRLSystem:
            )
            
        return rotation, scaling
+
+
+def _dot(a, b):
+   a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+   return np.einsum('...i,...i->...', a, b)
+
+
+def _norm(a):
+   return np.sqrt(_dot(a, a))
+
+
+def _cross(a, b):
+   """np.cross over the last axis, without its moveaxis copies"""
+   out = np.empty(np.broadcast_shapes(a.shape, b.shape))
+   out[..., 0] = a[..., 1] * b[..., 2] - a[..., 2] * b[..., 1]
+   out[..., 1] = a[..., 2] * b[..., 0] - a[..., 0] * b[..., 2]
+   out[..., 2] = a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+   return out
@@ -1,5 +1,6 @@
 from typing import Protocol, TypeVar, List, Dict
 from abc import ABC, abstractmethod
+import numpy as np
 
 # Type variables
 T = TypeVar('T')
@@ -31,7 +32,10 @@ class FusionInterface(Protocol[T]):
        ...
 
 class TopologicalInterface(Protocol):
-   """Interface for topological properties"""
+   """Interface for topological properties
+
+   Implemented for arbitrary abelian models by modular_data.AbelianModularData
+   """
    def modular_matrices(self) -> tuple[np.ndarray, np.ndarray]:
        """Get S and T modular matrices"""
        ...
@@ -0,0 +1,217 @@
+"""
+Eclipse search over long ephemeris time series
+
+Sun, Moon and Earth positions are (T, 3) arrays sampled on a common
+time grid, typically minute resolution over decades, and may be
+np.memmap files. They are read in chunks (plus a two-sample halo for
+the interpolation stencil), and umbra/penumbra cone geometry is computed
+for every sample of a chunk at once. A solar eclipse is contact of the
+Moon's penumbra with the Earth, a lunar eclipse contact of the Moon with
+the Earth's penumbra. First and last contact are refined below the sample
+spacing by bisection on 4-point Lagrange interpolants of the positions.
+"""
+import numpy as np
+
+R_SUN = 6.957e8      # m
+R_EARTH = 6.371e6    # m
+R_MOON = 1.7374e6    # m
+
+WINDOW_DTYPE = np.dtype([
+    ('kind', 'U5'), ('type', 'U9'), ('start', float), ('end', float),
+    ('peak', float), ('duration', float), ('peak_margin', float),
+])
+
+
+def shadow_geometry(source, blocker, target, r_source, r_blocker, r_target):
+    """
+    Shadow cones of blocker lit by source, evaluated at target
+
+    Parameters:
+    source, blocker, target (array): (..., 3) positions
+
+    Returns:
+    dict: Arrays of shape (...): 'rho' (target distance from the shadow
+    axis), 'penumbra' and 'umbra' cone radii at the target (umbra < 0
+    beyond the umbral vertex, i.e. antumbra), 'penumbral_margin' (rho -
+    penumbra - r_target, negative while in contact) and 'behind' (target
+    is on the far side of the blocker)
+    """
+    axis = blocker - source
+    distance = np.linalg.norm(axis, axis=-1)
+    u = axis / distance[..., None]
+    offset = target - blocker
+    z = np.einsum('...k,...k->...', offset, u)
+    rho = np.linalg.norm(offset - z[..., None] * u, axis=-1)
+
+    sin_f1 = (r_source + r_blocker) / distance
+    sin_f2 = (r_source - r_blocker) / distance
+    cos_f1, cos_f2 = np.sqrt(1 - sin_f1**2), np.sqrt(1 - sin_f2**2)
+    penumbra = z * sin_f1 / cos_f1 + r_blocker / cos_f1
+    umbra = r_blocker / cos_f2 - z * sin_f2 / cos_f2
+
+    behind = z > 0
+    return {
+        'rho': rho,
+        'penumbra': penumbra,
+        'umbra': umbra,
+        'penumbral_margin': np.where(behind, rho - penumbra - r_target, rho + np.abs(z)),
+        'behind': behind,
+    }
+
+
+def _configurations(r_sun, r_earth, r_moon):
+    # kind -> (source, blocker, target) indices into (sun, moon, earth) and radii
+    return {
+        'solar': ((0, 1, 2), (r_sun, r_moon, r_earth)),
+        'lunar': ((0, 2, 1), (r_sun, r_earth, r_moon)),
+    }
+
+
+def _classify(kind, geometry, k, r_target):
+    rho, umbra = geometry['rho'][k], geometry['umbra'][k]
+    if kind == 'solar':
+        if abs(umbra) + r_target > rho:
+            return 'total' if umbra > 0 else 'annular'
+        return 'partial'
+    if rho + r_target < umbra:
+        return 'total'
+    if rho - r_target < umbra:
+        return 'partial'
+    return 'penumbral'
+
+
+def _lagrange_weights(tau):
+    """Cubic weights for samples at -1, 0, 1, 2 evaluated at tau in [0, 1]"""
+    return np.stack([
+        -tau * (tau - 1) * (tau - 2) / 6,
+        (tau + 1) * (tau - 1) * (tau - 2) / 2,
+        -(tau + 1) * tau * (tau - 2) / 2,
+        (tau + 1) * tau * (tau - 1) / 6,
+    ], axis=-1)
+
+
+def _refine(bodies, index, kind_config, iterations=40):
+    """
+    Contact times between samples index and index + 1 (local indices),
+    as fractions of the sample interval
+    """
+    (a, b, c), radii = kind_config
+    stencil = np.clip(index[:, None] + np.arange(-1, 3), 0, len(bodies[0]) - 1)
+    points = [body[stencil] for body in bodies]          # (n, 4, 3) each
+
+    def margin(tau):
+        w = _lagrange_weights(tau)[:, :, None]
+        pos = [np.sum(w * p, axis=1) for p in points]
+        return shadow_geometry(pos[a], pos[b], pos[c], *radii)['penumbral_margin']
+
+    lo, hi = np.zeros(index.size), np.ones(index.size)
+    sign_lo = margin(lo) < 0
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        same = (margin(mid) < 0) == sign_lo
+        lo, hi = np.where(same, mid, lo), np.where(same, hi, mid)
+    return 0.5 * (lo + hi)
+
+
+def _open_input(array):
+    if isinstance(array, str):
+        return np.load(array, mmap_mode='r')
+    return array
+
+
+def scan_eclipses(sun, moon, earth, times=None, t0=0.0, dt=60.0, chunk=1 << 20,
+                  r_sun=R_SUN, r_earth=R_EARTH, r_moon=R_MOON, refine=True):
+    """
+    Find all solar and lunar eclipse windows
+
+    Parameters:
+    sun, moon, earth (array or str): (T, 3) positions in a common frame,
+        or paths of .npy files to memory-map
+    times (array or str): (T,) sample times; default t0 + dt * index
+    chunk (int): Samples processed per block
+    refine (bool): Refine contacts below the sample spacing (otherwise
+        the first/last sample in contact is reported)
+
+    Returns:
+    array: WINDOW_DTYPE structured array in order of start time; windows
+    already in progress at the first sample start there
+    """
+    bodies = [_open_input(a) for a in (sun, moon, earth)]
+    times = _open_input(times)
+    T = len(bodies[0])
+    configs = _configurations(r_sun, r_earth, r_moon)
+    target_radius = {'solar': r_earth, 'lunar': r_moon}
+
+    def time_at(index):
+        index = np.asarray(index, dtype=float)
+        if times is None:
+            return t0 + dt * index
+        base = np.floor(index).astype(np.int64)
+        frac = index - base
+        nxt = np.minimum(base + 1, T - 1)
+        return np.asarray(times[base]) * (1 - frac) + np.asarray(times[nxt]) * frac
+
+    windows = []
+    open_windows = dict.fromkeys(configs)
+    for start in range(0, max(T - 1, 1), chunk):
+        stop = min(start + chunk, T - 1) if T > 1 else 1
+        lo, hi = max(0, start - 1), min(T, stop + 2)
+        block = [np.asarray(b[lo:hi], dtype=float) for b in bodies]
+
+        for kind, config in configs.items():
+            (a, b, c), radii = config
+            geometry = shadow_geometry(block[a], block[b], block[c], *radii)
+            margin = geometry['penumbral_margin']
+            inside = margin < 0
+            before, after = inside[start - lo:stop - lo], inside[start - lo + 1:stop - lo + 1]
+
+            # (global interval index i, edge, fraction of [i, i + 1])
+            events = []
+            if start == 0 and inside[0]:
+                events.append((-1, 'start', 1.0))
+            for local, edge in ((np.flatnonzero(~before & after), 'start'),
+                                (np.flatnonzero(before & ~after), 'end')):
+                if local.size:
+                    frac = _refine(block, local + start - lo, config) if refine else \
+                        np.full(local.size, 1.0 if edge == 'start' else 0.0)
+                    events.extend((int(i), edge, float(f)) for i, f in zip(local + start, frac))
+            events.sort()
+
+            def track(window, last):
+                """Update the window's deepest sample over [window first, last]"""
+                first = max(window['first'], lo)
+                if last < first:
+                    return
+                k = first - lo + int(np.argmin(margin[first - lo:last - lo + 1]))
+                if window['best'] is None or margin[k] < window['best'][0]:
+                    peak = float(k + lo)
+                    if 0 < k < len(margin) - 1:
+                        m0, m1, m2 = margin[k - 1:k + 2]
+                        curvature = m0 - 2 * m1 + m2
+                        if curvature > 0:
+                            peak += 0.5 * (m0 - m2) / curvature
+                    window['best'] = (margin[k], peak, _classify(kind, geometry, k, target_radius[kind]))
+
+            for i, edge, frac in events:
+                if edge == 'start':
+                    open_windows[kind] = {'start': max(i + frac, 0.0), 'first': i + 1, 'best': None}
+                    continue
+                window = open_windows[kind]
+                if window is None:
+                    continue
+                track(window, i)
+                margin_at_peak, peak, kind_type = window['best']
+                windows.append((kind, kind_type, *time_at([window['start'], i + frac, peak]), 0.0, margin_at_peak))
+                open_windows[kind] = None
+
+            if open_windows[kind] is not None:
+                track(open_windows[kind], stop)
+
+    for kind, window in open_windows.items():
+        if window is not None and window['best'] is not None:
+            margin_at_peak, peak, kind_type = window['best']
+            windows.append((kind, kind_type, *time_at([window['start'], T - 1, peak]), 0.0, margin_at_peak))
+
+    result = np.array(windows, dtype=WINDOW_DTYPE)
+    result['duration'] = result['end'] - result['start']
+    return np.sort(result, order='start')
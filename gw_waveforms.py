@@ -0,0 +1,310 @@
+"""
+Post-Newtonian inspiral templates for whole template banks
+
+Templates are TaylorF2 stationary-phase waveforms (non-spinning, phase to
+3.5PN, leading-order amplitude) built directly in the frequency domain
+on the rfft grid of a time series, and brought to the time grid by a
+batched inverse FFT.
+
+The phase of every template is a linear combination of a few fixed
+functions of frequency, x^k and x^k ln x with x = (pi f)^(1/3), whose
+coefficients depend only on the masses and coalescence time:
+
+    Psi(f) = 2 pi f t_c - phi_c - pi/4 + 3 / (128 eta v^5) sum_k alpha_k v^k,
+    v = (pi M f)^(1/3) = M^(1/3) x
+
+so the phases of a block of templates are one (B, K) @ (K, F) matrix
+product. Generated blocks are kept in an LRU cache keyed by the grid and
+the template parameters.
+"""
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+G = 6.67430e-11          # m^3 kg^-1 s^-2
+C = 299792458.0          # m/s
+M_SUN = 1.98840987e30    # kg
+MPC = 3.0856775814913673e22  # m
+EULER_GAMMA = 0.5772156649015329
+
+# Basis functions of x = (pi f)^(1/3): (power, multiplied by ln x)
+PHASE_BASIS = ((-5, False), (-3, False), (-2, False), (-1, False), (0, False),
+               (0, True), (1, False), (1, True), (2, False))
+
+
+def chirp_mass(mass1, mass2):
+    return (mass1 * mass2)**0.6 / (mass1 + mass2)**0.2
+
+
+def isco_frequency(mass1, mass2):
+    """GW frequency at the Schwarzschild ISCO of the total mass (Hz)"""
+    return C**3 / (6**1.5 * np.pi * G * (mass1 + mass2))
+
+
+def chirp_time(mass1, mass2, f_low):
+    """Leading-order time from f_low to coalescence (s)"""
+    M = G * (mass1 + mass2) / C**3
+    eta = mass1 * mass2 / (mass1 + mass2)**2
+    return 5 * M / (256 * eta) * (np.pi * M * f_low)**(-8 / 3)
+
+
+def phase_coefficients(mass1, mass2, pn_order=7):
+    """
+    Coefficients of PHASE_BASIS in the PN phase of each template
+
+    Parameters:
+    mass1, mass2 (array): Component masses (kg)
+    pn_order (int): Twice the PN order kept (0..7)
+
+    Returns:
+    array: (B, len(PHASE_BASIS)) coefficients
+    """
+    m1, m2 = np.broadcast_arrays(np.atleast_1d(np.asarray(mass1, dtype=float)),
+                                 np.atleast_1d(np.asarray(mass2, dtype=float)))
+    M = G * (m1 + m2) / C**3
+    eta = m1 * m2 / (m1 + m2)**2
+    pi = np.pi
+    log_v_isco = -0.5 * np.log(6.0)
+
+    # alpha_k v^k, with the log terms of alpha_5 and alpha_6 split off
+    alpha = np.zeros((8,) + m1.shape)
+    alpha[0] = 1
+    alpha[2] = 3715 / 756 + 55 * eta / 9
+    alpha[3] = -16 * pi
+    alpha[4] = 15293365 / 508032 + 27145 * eta / 504 + 3085 * eta**2 / 72
+    alpha5 = pi * (38645 / 756 - 65 * eta / 9)
+    alpha[6] = (11583231236531 / 4694215680 - 640 * pi**2 / 3 - 6848 * EULER_GAMMA / 21
+                + (-15737765635 / 3048192 + 2255 * pi**2 / 12) * eta
+                + 76055 * eta**2 / 1728 - 127825 * eta**3 / 1296)
+    alpha6_log = -6848 / 21
+    alpha[7] = pi * (77096675 / 254016 + 378515 * eta / 1512 - 74045 * eta**2 / 756)
+    alpha[pn_order + 1:] = 0
+    if pn_order < 5:
+        alpha5 = 0 * eta
+    if pn_order < 6:
+        alpha6_log = 0
+
+    # v = M^(1/3) x; ln v = ln(M)/3 + ln x
+    scale = 3 / (128 * eta)
+    m3 = np.cbrt(M)
+    log_m3 = np.log(m3)
+    coefficients = np.zeros(m1.shape + (len(PHASE_BASIS),))
+    column = {basis: k for k, basis in enumerate(PHASE_BASIS)}
+    for k in (0, 2, 3, 4, 7):
+        coefficients[..., column[(k - 5, False)]] += scale * alpha[k] * m3**(k - 5)
+    # alpha_5 (1 + 3 ln(v / v_isco)) v^0
+    coefficients[..., column[(0, False)]] += scale * alpha5 * (1 + 3 * (log_m3 - log_v_isco))
+    coefficients[..., column[(0, True)]] += scale * alpha5 * 3
+    # (alpha_6 + alpha6_log ln(4 v)) v^1
+    coefficients[..., column[(1, False)]] += scale * (alpha[6] + alpha6_log * (np.log(4) + log_m3)) * m3
+    coefficients[..., column[(1, True)]] += scale * alpha6_log * m3
+    return coefficients
+
+
+class TemplateCache:
+    """
+    LRU of generated template blocks, bounded in bytes
+
+    Parameters:
+    max_bytes (int): Budget for all cached arrays
+    """
+
+    def __init__(self, max_bytes=1 << 30):
+        self.max_bytes = max_bytes
+        self._blocks = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        if key in self._blocks:
+            self.hits += 1
+            self._blocks.move_to_end(key)
+            return self._blocks[key]
+        self.misses += 1
+        block = compute()
+        block.flags.writeable = False
+        if block.nbytes <= self.max_bytes:
+            self._blocks[key] = block
+            self._bytes += block.nbytes
+            while self._bytes > self.max_bytes:
+                _, old = self._blocks.popitem(last=False)
+                self._bytes -= old.nbytes
+        return block
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._blocks), 'bytes': self._bytes}
+
+    def clear(self):
+        self._blocks.clear()
+        self._bytes = 0
+
+
+template_cache = TemplateCache()
+
+
+class ChirpBank:
+    """
+    Bank of TaylorF2 inspiral templates on a common time grid
+
+    Parameters:
+    mass1, mass2 (array): Component masses (kg), broadcast together
+    distance (array): Luminosity distance (m), broadcast against masses
+    sample_rate (float): Samples per second of the time grid
+    duration (float): Segment length in seconds (default: the longest
+        leading-order chirp from f_low plus one second, rounded up to a
+        power of two)
+    f_low (float): Templates start at this GW frequency (Hz)
+    pn_order (int): Twice the PN order of the phase (0..7)
+    t_coalescence (float): Coalescence time within the segment; the
+        default 0 is the matched-filtering convention, with the inspiral
+        wrapped around to the end of the segment
+    dtype: complex dtype of frequency-domain templates
+    cache (TemplateCache): Block cache, or None
+    """
+
+    def __init__(self, mass1, mass2, distance=MPC, sample_rate=4096.0, duration=None,
+                 f_low=20.0, pn_order=7, t_coalescence=0.0, dtype=np.complex64,
+                 cache=template_cache):
+        m1, m2, d = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float))
+                                          for a in (mass1, mass2, distance)))
+        self.mass1, self.mass2, self.distance = m1.ravel(), m2.ravel(), d.ravel()
+        self.sample_rate = float(sample_rate)
+        if duration is None:
+            longest = chirp_time(self.mass1, self.mass2, f_low).max() + 1
+            duration = 2.0**np.ceil(np.log2(longest))
+        self.duration = float(duration)
+        self.n_samples = int(round(self.duration * self.sample_rate))
+        self.f_low = f_low
+        self.pn_order = pn_order
+        self.t_coalescence = t_coalescence
+        self.dtype = np.dtype(dtype)
+        self.cache = cache
+
+        self.frequencies = np.fft.rfftfreq(self.n_samples, 1 / self.sample_rate)
+        self.times = np.arange(self.n_samples) / self.sample_rate
+        self.f_isco = isco_frequency(self.mass1, self.mass2)
+        f_high = self.f_isco.max() if self.f_isco.size else 0.0
+        self._band = slice(np.searchsorted(self.frequencies, f_low),
+                           np.searchsorted(self.frequencies, f_high, side='right'))
+
+        f = self.frequencies[self._band]
+        x = np.cbrt(np.pi * f)
+        log_x = np.log(x)
+        self._basis = np.stack([x**power * (log_x if log else 1.0) for power, log in PHASE_BASIS])
+        self._f_power = f**(-7 / 6)
+        self._phase = phase_coefficients(self.mass1, self.mass2, pn_order)
+        # sqrt(5/24) pi^(-2/3) c / d (G Mc / c^3)^(5/6)
+        self._amplitude = (np.sqrt(5 / 24) * np.pi**(-2 / 3) * C / self.distance
+                           * (G * chirp_mass(self.mass1, self.mass2) / C**3)**(5 / 6))
+
+    def __len__(self):
+        return self.mass1.size
+
+    def _rows(self, rows):
+        if rows is None:
+            return np.arange(len(self))
+        if isinstance(rows, slice):
+            return np.arange(len(self))[rows]
+        return np.atleast_1d(np.asarray(rows, dtype=np.int64))
+
+    def _key(self, domain, rows):
+        digest = hashlib.sha256()
+        for array in (self.mass1[rows], self.mass2[rows], self.distance[rows]):
+            digest.update(array.tobytes())
+        grid = (self.sample_rate, self.n_samples, self.f_low, self.pn_order,
+                self.t_coalescence, self.dtype.str)
+        return (domain, grid, digest.hexdigest())
+
+    def _cached(self, domain, rows, compute):
+        if self.cache is None:
+            return compute()
+        return self.cache.get_or_compute(self._key(domain, rows), compute)
+
+    def _synthesize(self, rows):
+        """Frequency-domain templates h(f) of the given rows, (B, F)"""
+        out = np.zeros((rows.size, self.frequencies.size), dtype=self.dtype)
+        if self._band.start >= self._band.stop:
+            return out
+        # Phase in turns, reduced to [-1/2, 1/2] in double precision so
+        # the trigonometry can run in the output precision
+        turns = (self._phase[rows] / (2 * np.pi)) @ self._basis
+        turns += (self.t_coalescence * self.frequencies[self._band] - 1 / 8)[None, :]
+        np.subtract(turns, np.rint(turns), out=turns)
+        real = out.real.dtype
+        angle = turns.astype(real)
+        angle *= real.type(-2 * np.pi)
+
+        band = out[:, self._band]
+        np.cos(angle, out=band.real)
+        np.sin(angle, out=band.imag)
+        band *= self._amplitude[rows, None].astype(real) * self._f_power[None, :].astype(real)
+        # Templates end at their own ISCO
+        cut = np.searchsorted(self.frequencies[self._band], self.f_isco[rows], side='right')
+        band[np.arange(band.shape[1])[None, :] >= cut[:, None]] = 0
+        return out
+
+    def frequency_domain(self, rows=None):
+        """
+        Templates on the rfft frequency grid
+
+        Parameters:
+        rows: Template indices or slice (default: the whole bank)
+
+        Returns:
+        array: (B, n_samples // 2 + 1) read-only complex array
+        """
+        rows = self._rows(rows)
+        return self._cached('frequency', rows, lambda: self._synthesize(rows))
+
+    def time_domain(self, rows=None):
+        """
+        Templates on the time grid (inverse rfft of frequency_domain)
+
+        Returns:
+        array: (B, n_samples) read-only real array
+        """
+        rows = self._rows(rows)
+        real = np.float32 if self.dtype == np.complex64 else np.float64
+
+        def compute():
+            # rfft convention: h(t) = sum_f h(f) e^{2 pi i f t} df
+            return (np.fft.irfft(self.frequency_domain(rows), n=self.n_samples, axis=-1)
+                    * self.sample_rate).astype(real)
+        return self._cached('time', rows, compute)
+
+    def analytic(self, rows=None):
+        """
+        Complex analytic templates: real part is time_domain, modulus the
+        amplitude envelope
+
+        Returns:
+        array: (B, n_samples) complex array
+        """
+        spectrum = np.zeros((self._rows(rows).size, self.n_samples), dtype=self.dtype)
+        one_sided = self.frequency_domain(rows)
+        spectrum[:, :one_sided.shape[1]] = one_sided
+        spectrum[:, 1:(self.n_samples + 1) // 2] *= 2
+        return np.fft.ifft(spectrum, axis=-1) * self.sample_rate
+
+    def blocks(self, size=256, domain='frequency'):
+        """
+        Generator over (rows, templates) blocks of the bank
+
+        Parameters:
+        size (int): Templates per block
+        domain (str): 'frequency' or 'time'
+        """
+        generate = self.frequency_domain if domain == 'frequency' else self.time_domain
+        for start in range(0, len(self), size):
+            rows = np.arange(start, min(start + size, len(self)))
+            yield rows, generate(rows)
+
+    def instantaneous_frequency(self, times, row=0):
+        """Leading-order GW frequency at the given times (before t_c)"""
+        Mc = G * chirp_mass(self.mass1[row], self.mass2[row]) / C**3
+        tau = np.maximum(self.t_coalescence - np.asarray(times, dtype=float), 1e-12)
+        f = (5 / tau)**(3 / 8) * Mc**(-5 / 8) / (8 * np.pi)
+        return np.where(f <= self.f_isco[row], f, np.nan)
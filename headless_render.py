@@ -0,0 +1,168 @@
+"""
+Incremental figure rendering for batch jobs
+
+A figure is described as a list of Panels. Each panel builds its axes
+artists once (build), computes the data it shows from a parameter set
+(compute), and pushes that data into the existing artists (update, via
+set_data, set_offsets, set_height, ...). PanelFigure renders parameter
+sets one after another into the same figure, so only data changes
+between frames, and only the analyses of the requested panels run.
+Panels that share an analysis get it through a per-render memo.
+
+Headless figures use the Agg canvas directly, without pyplot, so no
+display is needed. render_many spreads parameter sets over a process
+pool; each worker builds its figure once and reuses it for every task.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+class Panel:
+    """
+    One subplot of a PanelFigure
+
+    Parameters:
+    name (str): Panel name used to select panels
+    build: build(ax) -> artists, draws the static parts once
+    compute: compute(params, memo) -> data; memo(key, function) runs
+        function at most once per render
+    update: update(ax, artists, data) pushes data into the artists
+    """
+
+    def __init__(self, name, build, compute=None, update=None):
+        self.name = name
+        self.build = build
+        self.compute = compute
+        self.update = update
+
+
+class _Memo:
+    def __init__(self):
+        self._values = {}
+
+    def __call__(self, key, function):
+        if key not in self._values:
+            self._values[key] = function()
+        return self._values[key]
+
+
+class PanelFigure:
+    """
+    Figure whose artists are built once and updated per parameter set
+
+    Parameters:
+    panels (list): Panel objects, laid out in a grid
+    layout (tuple): (rows, columns), default as square as possible
+    figure: Existing matplotlib Figure (e.g. from pyplot for interactive
+        use); by default a headless Agg figure
+    figsize (tuple): Figure size in inches for a new figure
+    dpi (int): Resolution of saved images
+    """
+
+    def __init__(self, panels, layout=None, figure=None, figsize=(15, 10), dpi=100):
+        if figure is None:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+
+            figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(figure)
+        self.figure = figure
+        self.panels = list(panels)
+        if layout is None:
+            columns = 1 if len(self.panels) == 1 else 2
+            layout = (-(-len(self.panels) // columns), columns)
+        self.axes = {}
+        self.artists = {}
+        for k, panel in enumerate(self.panels):
+            ax = figure.add_subplot(layout[0], layout[1], k + 1)
+            self.axes[panel.name] = ax
+            self.artists[panel.name] = panel.build(ax)
+        self._laid_out = False
+        self.frames = 0
+
+    def update(self, params=None):
+        """Compute the requested panels for params and update their artists"""
+        params = {} if params is None else params
+        memo = _Memo()
+        for panel in self.panels:
+            if panel.compute is None:
+                continue
+            ax = self.axes[panel.name]
+            panel.update(ax, self.artists[panel.name], panel.compute(params, memo))
+            # relim only sees lines, patches and images
+            ax.relim()
+            for collection in ax.collections:
+                offsets = collection.get_offsets()
+                if len(offsets):
+                    ax.update_datalim(offsets)
+            ax.autoscale_view()
+        if not self._laid_out:
+            self.figure.tight_layout()
+            self._laid_out = True
+        self.frames += 1
+
+    def render(self, params=None, path=None, **savefig):
+        """
+        Render one parameter set
+
+        Parameters:
+        path (str): Image file to write (format from the extension); when
+            None the RGBA pixels are returned instead
+        savefig: Extra Figure.savefig options
+
+        Returns:
+        str or array: path, or an (H, W, 4) uint8 array
+        """
+        self.update(params)
+        if path is None:
+            import numpy as np
+
+            self.figure.canvas.draw()
+            return np.asarray(self.figure.canvas.buffer_rgba()).copy()
+        self.figure.savefig(path, **savefig)
+        return path
+
+
+_FIGURE = None
+
+
+def _init_worker(factory, panels, options):
+    global _FIGURE
+    _FIGURE = PanelFigure(factory(panels), **options)
+
+
+def _render_task(task):
+    params, path, savefig = task
+    return _FIGURE.render(params, path, **savefig)
+
+
+def render_many(factory, param_sets, paths, panels=None, workers=None, savefig=None, **options):
+    """
+    Render many parameter sets to image files
+
+    Parameters:
+    factory: Module-level function panels(names) -> list of Panel
+        (picklable, since worker processes call it)
+    param_sets (list): One params dict per image
+    paths (list or str): Output files, or a directory to write
+        frame_00000.png, ... into
+    panels (list): Panel names to draw (default: all)
+    workers (int): Worker processes (default: render serially)
+    savefig (dict): Figure.savefig options
+    options: PanelFigure options (layout, figsize, dpi)
+
+    Returns:
+    list: Written paths in input order
+    """
+    param_sets = list(param_sets)
+    if isinstance(paths, (str, os.PathLike)):
+        os.makedirs(paths, exist_ok=True)
+        paths = [os.path.join(paths, f'frame_{k:05d}.png') for k in range(len(param_sets))]
+    tasks = [(params, path, savefig or {}) for params, path in zip(param_sets, paths)]
+
+    if workers is None or workers <= 1:
+        figure = PanelFigure(factory(panels), **options)
+        return [figure.render(params, path, **extra) for params, path, extra in tasks]
+    with ProcessPoolExecutor(workers, initializer=_init_worker,
+                             initargs=(factory, panels, options)) as pool:
+        return list(pool.map(_render_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
@@ -0,0 +1,106 @@
+"""
+Import-time benchmark for the analysis modules
+
+Each module is imported in a fresh interpreter with -X importtime and
+the per-module lines are parsed from stderr. The cumulative time of the
+module itself is its startup cost; the heavy packages (matplotlib,
+sympy, scipy, nltk) that it pulled in are listed with their own
+cumulative times. The analysis modules only load those on first use of
+the feature that needs them, so a heavy package showing up here means
+an eager import crept back in.
+
+Run as a script to print the table; the exit status is nonzero when a
+module loads a package listed for it in LAZY_DEPENDENCIES.
+"""
+import os
+import subprocess
+import sys
+
+HEAVY_PACKAGES = ('matplotlib', 'sympy', 'scipy', 'nltk')
+
+# Packages each module must not import at startup
+LAZY_DEPENDENCIES = {
+    'CosmicMotionAnalysis': HEAVY_PACKAGES,
+    'GravitationalAnomaliesAnalysis': HEAVY_PACKAGES,
+    'rocket_dynamics': HEAVY_PACKAGES,
+    'trajectory_cache': HEAVY_PACKAGES,
+    'headless_render': HEAVY_PACKAGES,
+}
+
+
+def import_times(module, python=sys.executable, path=None):
+    """
+    Cumulative import times of one module in a fresh interpreter
+
+    Parameters:
+    module (str): Module name
+    path (str): Directory put first on PYTHONPATH (default: this one)
+
+    Returns:
+    dict: Top-level package name -> cumulative microseconds, for every
+    package imported at top level (including module itself)
+    """
+    path = path or os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [path, os.environ.get('PYTHONPATH')])))
+    process = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                             capture_output=True, text=True, env=env, cwd=path)
+    if process.returncode:
+        raise ImportError(f"Importing {module} failed:\n{process.stderr.strip().splitlines()[-1]}")
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        # Packages are nested by indentation; their top-level entry is the
+        # one with the largest cumulative time
+        top = name.strip().split('.')[0]
+        times[top] = max(times.get(top, 0), int(cumulative))
+    return times
+
+
+def benchmark_imports(modules=None, runs=5):
+    """
+    Best-of-runs startup cost of each module
+
+    Parameters:
+    modules (list): Module names (default: LAZY_DEPENDENCIES)
+    runs (int): Fresh interpreters per module
+
+    Returns:
+    list: Rows with 'module', 'milliseconds', 'heavy' ({package:
+    milliseconds} of heavy packages loaded) and 'violations' (heavy
+    packages that LAZY_DEPENDENCIES says must load lazily)
+    """
+    rows = []
+    for module in modules or LAZY_DEPENDENCIES:
+        best = None
+        for _ in range(runs):
+            times = import_times(module)
+            if best is None or times[module] < best[module]:
+                best = times
+        heavy = {name: best[name] / 1000 for name in HEAVY_PACKAGES if name in best}
+        rows.append({
+            'module': module,
+            'milliseconds': best[module] / 1000,
+            'heavy': heavy,
+            'violations': sorted(set(heavy) & set(LAZY_DEPENDENCIES.get(module, ()))),
+        })
+    return rows
+
+
+def main():
+    rows = benchmark_imports(sys.argv[1:] or None)
+    print(f"{'module':>32} {'ms':>8}  heavy packages loaded")
+    for row in rows:
+        heavy = ', '.join(f"{name} {ms:.0f} ms" for name, ms in row['heavy'].items()) or '-'
+        print(f"{row['module']:>32} {row['milliseconds']:>8.1f}  {heavy}")
+    failed = [row for row in rows if row['violations']]
+    for row in failed:
+        print(f"{row['module']} imports {', '.join(row['violations'])} at startup", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
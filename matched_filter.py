@@ -0,0 +1,301 @@
+"""
+Streaming matched-filter search over long strain records
+
+Strain is read from a memory-mapped file (or any array) in overlapping
+segments of the template length n. Each segment is transformed once,
+multiplied by a block of whitened, normalized template conjugates, and
+brought back with one batched complex inverse FFT per block:
+
+    z(t) = 4 df sum_{f > 0} s(f) conj(h(f)) / S_n(f) e^{2 pi i f t} / sigma
+
+|z| is the SNR maximized over coalescence phase. Templates coalesce at
+t = 0 with the inspiral wrapped to the end of the segment, so the first
+(chirp length + guard) samples of each segment are corrupted by
+wrap-around; segments overlap by that much and only the rest is kept.
+The FFT work buffer is allocated once and reused for every block and
+segment, and scipy.fft keeps its plans cached between calls.
+
+Triggers (local SNR maxima over the bank, clustered in time) are
+yielded as soon as their cluster window has passed.
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+import scipy.fft
+
+from gw_waveforms import M_SUN, MPC, ChirpBank, chirp_time
+
+TRIGGER_DTYPE = np.dtype([
+    ('time', float), ('snr', float), ('phase', float),
+    ('template', np.int64), ('mass1', float), ('mass2', float),
+])
+
+
+def open_strain(source, dtype=np.float32):
+    """
+    Strain as an array: .npy paths are memory-mapped, other paths are
+    read as raw samples of dtype, arrays pass through
+    """
+    if isinstance(source, (str, os.PathLike)):
+        if str(source).endswith('.npy'):
+            return np.load(source, mmap_mode='r')
+        return np.memmap(source, dtype=dtype, mode='r')
+    return source
+
+
+def welch_psd(strain, sample_rate, n_fft, max_segments=64):
+    """
+    One-sided PSD by averaging Hann-windowed periodograms (50% overlap)
+
+    Only the first max_segments segments are read, so this is cheap on
+    long memory-mapped records.
+
+    Returns:
+    tuple: (frequencies, psd) on the rfft grid of n_fft
+    """
+    window = np.hanning(n_fft)
+    scale = 2.0 / (sample_rate * np.sum(window**2))
+    step = n_fft // 2
+    starts = range(0, len(strain) - n_fft + 1, step)
+    total = np.zeros(n_fft // 2 + 1)
+    count = 0
+    for start in starts:
+        segment = np.asarray(strain[start:start + n_fft], dtype=float)
+        total += np.abs(np.fft.rfft((segment - segment.mean()) * window))**2
+        count += 1
+        if count == max_segments:
+            break
+    if not count:
+        raise ValueError("Strain is shorter than one PSD segment")
+    psd = total * scale / count
+    psd[0] = psd[-1] = psd[1:-1].mean()
+    return np.fft.rfftfreq(n_fft, 1 / sample_rate), psd
+
+
+class MatchedFilter:
+    """
+    Matched filter of a template bank against streamed strain
+
+    Parameters:
+    bank (ChirpBank): Templates, coalescing at t = 0
+    psd: Noise PSD as an array on bank.frequencies, a callable of
+        frequency, a (frequencies, psd) pair, or None to estimate it from
+        the strain being filtered
+    block (int): Templates per batched inverse FFT
+    guard (float): Seconds dropped at both segment ends against the
+        impulse response of 1/S_n
+    workers (int): Threads for scipy.fft (-1 for all cores)
+    """
+
+    def __init__(self, bank, psd=None, block=64, guard=0.25, workers=None):
+        if bank.t_coalescence != 0:
+            raise ValueError("Templates must coalesce at t = 0 (t_coalescence=0)")
+        self.bank = bank
+        self.block = block
+        self.workers = workers
+        self.n = bank.n_samples
+        self.df = bank.sample_rate / self.n
+        self.guard = int(round(guard * bank.sample_rate))
+        longest = chirp_time(bank.mass1, bank.mass2, bank.f_low).max()
+        self.skip = int(np.ceil(longest * bank.sample_rate)) + self.guard
+        self.step = self.n - self.skip - self.guard
+        if self.step <= 0:
+            raise ValueError("Templates do not fit in the segment; increase the bank duration")
+
+        real = np.float32 if bank.dtype == np.complex64 else np.float64
+        self._buffer = np.empty((block, self.n), dtype=bank.dtype)
+        self._real = real
+        self.whiten = None
+        self.sigma = None
+        if psd is not None:
+            self.set_psd(psd)
+
+    def set_psd(self, psd):
+        """Set the noise PSD and renormalize the bank"""
+        f = self.bank.frequencies
+        if callable(psd):
+            values = psd(f)
+        elif isinstance(psd, tuple):
+            values = np.interp(f, *psd)
+        else:
+            values = np.asarray(psd, dtype=float)
+        # Data and templates are each whitened by sqrt(4 df / S_n), which
+        # keeps both of order one in single precision
+        whiten = np.zeros(f.size)
+        band = (f >= self.bank.f_low) & (values > 0)
+        whiten[band] = np.sqrt(4 * self.df / values[band])
+        self.whiten = whiten.astype(self._real)
+
+        sigma = np.empty(len(self.bank))
+        for rows, templates in self.bank.blocks(self.block):
+            white = np.abs(templates) * self.whiten
+            sigma[rows] = np.sqrt(np.einsum('bf,bf->b', white, white, dtype=float))
+        self.sigma = sigma
+        # Templates entirely outside the band never trigger
+        self._inverse_sigma = np.divide(1, sigma, out=np.zeros_like(sigma), where=sigma > 0).astype(self._real)
+
+    def segments(self, strain):
+        """
+        Overlapping segments of the strain
+
+        Yields:
+        tuple: (first valid sample index in the record, valid slice of
+        the segment, segment samples)
+        """
+        total = len(strain)
+        if total < self.n:
+            raise ValueError("Strain is shorter than one template segment")
+        begin = 0
+        while True:
+            # The last segment is shifted back to end at the data; its
+            # valid part still starts where the previous one stopped
+            start = min(begin, total - self.n)
+            segment = np.asarray(strain[start:start + self.n], dtype=self._real)
+            first = begin + self.skip
+            yield first, slice(first - start, self.n - self.guard), segment
+            if start + self.n >= total:
+                break
+            begin += self.step
+
+    def _segment_snr(self, segment, valid):
+        """Maximum SNR over the bank per valid sample, with template and phase"""
+        # Continuous-FT convention: s(f) = dt * DFT
+        data = scipy.fft.rfft(segment, workers=self.workers)
+        data *= self.whiten / self._real(self.bank.sample_rate)
+        width = valid.stop - valid.start
+        best = np.zeros(width, dtype=self._real)
+        best_template = np.zeros(width, dtype=np.int64)
+        best_phase = np.zeros(width, dtype=self._real)
+        F = data.size
+        for rows, templates in self.bank.blocks(self.block):
+            buffer = self._buffer[:rows.size]
+            np.conjugate(templates, out=buffer[:, :F])
+            buffer[:, :F] *= data * self.whiten
+            buffer[:, :F] *= self._inverse_sigma[rows, None]
+            buffer[:, F:] = 0
+            z = scipy.fft.ifft(buffer, axis=-1, overwrite_x=True, workers=self.workers)[:, valid]
+            snr = np.abs(z)
+            snr *= self.n
+            k = np.argmax(snr, axis=0)
+            loudest = snr[k, np.arange(width)]
+            better = loudest > best
+            best[better] = loudest[better]
+            best_template[better] = rows[k[better]]
+            best_phase[better] = np.angle(z[k[better], np.flatnonzero(better)])
+        return best, best_template, best_phase
+
+    def filter(self, strain, threshold=8.0, cluster=0.1, t0=0.0):
+        """
+        Generator of SNR triggers over a strain record
+
+        Parameters:
+        strain (array or str): Samples, or path of a .npy/raw file to
+            memory-map
+        threshold (float): Minimum SNR
+        cluster (float): Triggers closer than this (s) are merged into
+            the loudest one
+        t0 (float): Time of the first sample
+
+        Yields:
+        np.void: TRIGGER_DTYPE record per clustered trigger, in time order
+        """
+        strain = open_strain(strain)
+        fs = self.bank.sample_rate
+        if self.whiten is None:
+            self.set_psd(welch_psd(strain, fs, min(self.n, int(4 * fs))))
+        window = int(round(cluster * fs))
+
+        pending = None
+        for first, valid, segment in self.segments(strain):
+            snr, template, phase = self._segment_snr(segment, valid)
+            loud = np.flatnonzero(snr > threshold)
+            if not loud.size:
+                continue
+            # Runs of loud samples closer than the window form one cluster
+            breaks = np.flatnonzero(np.diff(loud) > window) + 1
+            for run in np.split(loud, breaks):
+                k = run[np.argmax(snr[run])]
+                index = first + k
+                candidate = (index, snr[k], phase[k], template[k])
+                if pending is not None and index - pending[0] <= window:
+                    if candidate[1] > pending[1]:
+                        pending = candidate
+                    continue
+                if pending is not None:
+                    yield self._record(pending, t0)
+                pending = candidate
+        if pending is not None:
+            yield self._record(pending, t0)
+
+    def _record(self, candidate, t0):
+        index, snr, phase, template = candidate
+        record = np.zeros((), dtype=TRIGGER_DTYPE)
+        record[()] = (t0 + index / self.bank.sample_rate, snr, phase, template,
+                      self.bank.mass1[template], self.bank.mass2[template])
+        return record[()]
+
+
+def benchmark_throughput(n_templates=256, duration=512.0, sample_rate=2048.0, f_low=30.0,
+                         block=64, workers=None, snr=12.0, seed=0):
+    """
+    Filter white noise with one injected chirp from a memory-mapped file
+
+    Returns:
+    dict: Wall time, real-time factor (seconds of strain filtered per
+    second against the whole bank), template-seconds per second, and
+    whether the injection was recovered
+    """
+    rng = np.random.default_rng(seed)
+    mass1 = rng.uniform(5, 40, n_templates) * M_SUN
+    mass2 = rng.uniform(5, 40, n_templates) * M_SUN
+    bank = ChirpBank(mass1, mass2, 400 * MPC, sample_rate=sample_rate, f_low=f_low)
+    total = int(duration * sample_rate)
+    sigma_noise = 1e-21
+    psd = np.full(bank.frequencies.size, 2 * sigma_noise**2 / sample_rate)
+    matched = MatchedFilter(bank, psd=psd, block=block, workers=workers)
+
+    # Inject template `k` coalescing at the middle of the record
+    k = n_templates // 2
+    chirp = np.roll(bank.time_domain([k])[0].astype(float), bank.n_samples // 2)
+    chirp *= snr / matched.sigma[k]
+    t_inject = total // 2
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'strain.npy')
+        strain = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(total,))
+        for start in range(0, total, 1 << 20):
+            stop = min(start + (1 << 20), total)
+            strain[start:stop] = rng.normal(0, sigma_noise, stop - start)
+        lo = t_inject - bank.n_samples // 2
+        strain[lo:lo + bank.n_samples] += chirp.astype(np.float32)
+        strain.flush()
+        del strain
+
+        start = time.perf_counter()
+        triggers = np.array(list(matched.filter(path, threshold=0.75 * snr)), dtype=TRIGGER_DTYPE)
+        wall = time.perf_counter() - start
+
+    found = triggers[np.abs(triggers['time'] - t_inject / sample_rate) < 0.1] \
+        if triggers.size else triggers
+    return {
+        'templates': n_templates,
+        'data_seconds': duration,
+        'wall_seconds': wall,
+        'realtime_factor': duration / wall,
+        'template_seconds_per_second': n_templates * duration / wall,
+        'triggers': triggers.size,
+        'recovered_snr': float(found['snr'].max()) if found.size else 0.0,
+        'injected_snr': snr,
+    }
+
+
+def main():
+    report = benchmark_throughput()
+    for key, value in report.items():
+        print(f"{key:>28}: {value:.4g}" if isinstance(value, float) else f"{key:>28}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+"""
+N-body gravity with symplectic integrators
+
+Accelerations come from one of three force modes:
+
+- 'direct': all pairs, vectorized in blocks of targets, O(N^2)
+- 'barnes_hut': octree with opening angle theta, O(N log N). The tree
+  is built from Morton-sorted bodies, one array per level, and walked
+  level by level over whole arrays of (target, node) pairs.
+- 'parallel': the direct (or, with tree=True, Barnes-Hut) sum split
+  over target blocks in a process pool
+
+Integrators are drift-kick-drift compositions: leapfrog (2nd order) and
+Yoshida's 4th-order triple jump.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+G_SI = 6.67430e-11
+
+# (drift, kick) coefficient sequences of each composition scheme
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = -2 ** (1 / 3) / (2 - 2 ** (1 / 3))
+INTEGRATORS = {
+    'leapfrog': ((0.5, 0.5), (1.0,)),
+    'yoshida4': ((_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2), (_W1, _W0, _W1)),
+}
+
+MORTON_BITS = 21
+
+
+def direct_accelerations(pos, mass, G=G_SI, softening=0.0, targets=None, block=1024):
+    """
+    Pairwise accelerations on targets (default: all bodies)
+
+    Parameters:
+    pos (array): (N, 3) positions
+    mass (array): (N,) masses
+    softening (float): Plummer softening length
+    targets (array): Indices of the bodies to compute
+    block (int): Targets per vectorized block, bounding memory to
+        block * N * 3 floats
+
+    Returns:
+    array: (len(targets), 3) accelerations
+    """
+    targets = np.arange(len(pos)) if targets is None else np.asarray(targets)
+    acc = np.empty((targets.size, 3))
+    eps2 = softening**2
+    for start in range(0, targets.size, block):
+        idx = targets[start:start + block]
+        d = pos[None, :, :] - pos[idx, None, :]
+        r2 = np.einsum('ijk,ijk->ij', d, d) + eps2
+        r2[np.arange(idx.size), idx] = np.inf
+        acc[start:start + block] = G * np.einsum('ij,ijk->ik', mass / (r2 * np.sqrt(r2)), d)
+    return acc
+
+
+def potential_energy(pos, mass, G=G_SI, softening=0.0, block=1024):
+    """Total pairwise potential energy, blocked like direct_accelerations"""
+    energy = 0.0
+    eps2 = softening**2
+    for start in range(0, len(pos), block):
+        idx = np.arange(start, min(start + block, len(pos)))
+        d = pos[None, :, :] - pos[idx, None, :]
+        r = np.sqrt(np.einsum('ijk,ijk->ij', d, d) + eps2)
+        r[np.arange(idx.size), idx] = np.inf
+        energy -= 0.5 * G * np.sum(mass[idx, None] * mass[None, :] / r)
+    return energy
+
+
+def _spread_bits(x):
+    """Insert two zero bits between each of the low 21 bits"""
+    x = x.astype(np.uint64) & np.uint64(0x1FFFFF)
+    x = (x | (x << np.uint64(32))) & np.uint64(0x1F00000000FFFF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x1F0000FF0000FF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x100F00F00F00F00F)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x10C30C30C30C30C3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x1249249249249249)
+    return x
+
+
+class Octree:
+    """
+    Linear octree over Morton-sorted bodies
+
+    Level l has one entry per occupied cell of side size / 2^l: its
+    Morton prefix, first body (in sorted order), body count, mass and
+    centre of mass. The children of a cell are a contiguous range of the
+    next level.
+    """
+
+    def __init__(self, pos, mass, depth=MORTON_BITS):
+        self.depth = depth
+        lo = pos.min(axis=0)
+        self.size = float(np.max(pos.max(axis=0) - lo)) * (1 + 1e-12) or 1.0
+        cells = np.minimum(((pos - lo) / self.size * 2**depth).astype(np.int64), 2**depth - 1)
+        keys = _spread_bits(cells[:, 0]) << np.uint64(2) | _spread_bits(cells[:, 1]) << np.uint64(1) \
+            | _spread_bits(cells[:, 2])
+        self.order = np.argsort(keys, kind='stable')
+        self.keys = keys[self.order]
+        self.pos = pos[self.order]
+        self.mass = mass[self.order]
+
+        weighted = self.pos * self.mass[:, None]
+        self.levels = []
+        for level in range(depth + 1):
+            prefix = self.keys >> np.uint64(3 * (depth - level))
+            starts = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            counts = np.diff(np.r_[starts, len(prefix)])
+            m = np.add.reduceat(self.mass, starts)
+            com = np.add.reduceat(weighted, starts, axis=0) / np.where(m > 0, m, 1.0)[:, None]
+            self.levels.append({
+                'prefix': prefix[starts], 'start': starts, 'count': counts,
+                'mass': m, 'com': com, 'size': self.size / 2**level,
+            })
+            if counts.max() == 1:
+                break
+        for parent, child in zip(self.levels[:-1], self.levels[1:]):
+            parent['first_child'] = np.searchsorted(child['start'], parent['start'])
+            parent['n_children'] = np.diff(np.r_[parent['first_child'], len(child['start'])])
+
+    def accelerations(self, G=G_SI, softening=0.0, theta=0.5, targets=None, block=4096):
+        """
+        Barnes-Hut accelerations on targets (original body indices)
+
+        A cell is used as a point mass when size / distance < theta and it
+        does not contain the target; single-body cells are always exact.
+        """
+        n = len(self.order)
+        rank = np.empty(n, dtype=np.int64)
+        rank[self.order] = np.arange(n)
+        targets = np.arange(n) if targets is None else np.asarray(targets)
+        acc = np.zeros((targets.size, 3))
+        eps2 = softening**2
+        last = len(self.levels) - 1
+
+        for start in range(0, targets.size, block):
+            sorted_targets = rank[targets[start:start + block]]
+            # Per-pair arrays: local target index, its key and position, and the cell
+            t = np.arange(sorted_targets.size)
+            key, pos = self.keys[sorted_targets], self.pos[sorted_targets]
+            node = np.zeros(t.size, dtype=np.int64)
+            for level_index, level in enumerate(self.levels):
+                inside = level['prefix'][node] == key >> np.uint64(3 * (self.depth - level_index))
+                single = level['count'][node] == 1
+                d = level['com'][node] - pos
+                r2 = np.einsum('ij,ij->i', d, d)
+                if level_index == last:
+                    # Cells still holding several bodies only at full depth
+                    use = ~(inside & single) & (r2 > 0)
+                else:
+                    use = ~inside & (single | (level['size']**2 < theta**2 * r2))
+
+                hit = np.flatnonzero(use)
+                w = G * level['mass'][node[hit]] / ((r2[hit] + eps2) * np.sqrt(r2[hit] + eps2))
+                for axis in range(3):
+                    acc[start:start + block, axis] += np.bincount(
+                        t[hit], weights=w * d[hit, axis], minlength=sorted_targets.size)
+
+                opened = np.flatnonzero(~use & ~(single & inside))
+                if level_index == last or not opened.size:
+                    break
+                node = node[opened]
+                counts = level['n_children'][node]
+                first = np.cumsum(counts) - counts
+                offsets = np.arange(first[-1] + counts[-1]) - np.repeat(first, counts)
+                node = np.repeat(level['first_child'][node], counts) + offsets
+                t, key, pos = (np.repeat(a[opened], counts, axis=0) for a in (t, key, pos))
+        return acc
+
+
+def barnes_hut_accelerations(pos, mass, G=G_SI, softening=0.0, theta=0.5, targets=None):
+    """Build an Octree and evaluate Barnes-Hut accelerations"""
+    return Octree(pos, mass).accelerations(G, softening, theta, targets)
+
+
+def _accelerations_block(pos, mass, G, softening, targets, tree, theta):
+    """Process-pool worker for the 'parallel' force mode"""
+    if tree:
+        return barnes_hut_accelerations(pos, mass, G, softening, theta, targets)
+    return direct_accelerations(pos, mass, G, softening, targets)
+
+
+class NBodySystem:
+    """
+    Self-gravitating point masses
+
+    Parameters:
+    positions (array): (N, 3) positions
+    velocities (array): (N, 3) velocities
+    masses (array): (N,) masses
+    G (float): Gravitational constant
+    softening (float): Plummer softening length
+    force (str): 'direct', 'barnes_hut' or 'parallel'
+    theta (float): Barnes-Hut opening angle
+    workers (int): Processes for the 'parallel' mode
+    tree (bool): Use Barnes-Hut inside each 'parallel' worker
+    """
+
+    def __init__(self, positions, velocities, masses, G=G_SI, softening=0.0,
+                 force='direct', theta=0.5, workers=None, tree=False):
+        self.pos = np.array(positions, dtype=float)
+        self.vel = np.array(velocities, dtype=float)
+        self.mass = np.array(masses, dtype=float)
+        self.G = G
+        self.softening = softening
+        self.force = force
+        self.theta = theta
+        self.workers = workers or os.cpu_count()
+        self.tree = tree
+        self.time = 0.0
+        self._pool = None
+
+    def accelerations(self):
+        if self.force == 'direct':
+            return direct_accelerations(self.pos, self.mass, self.G, self.softening)
+        if self.force == 'barnes_hut':
+            return barnes_hut_accelerations(self.pos, self.mass, self.G, self.softening, self.theta)
+        if self.force == 'parallel':
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            blocks = np.array_split(np.arange(len(self.pos)), self.workers)
+            futures = [self._pool.submit(_accelerations_block, self.pos, self.mass, self.G,
+                                         self.softening, block, self.tree, self.theta)
+                       for block in blocks]
+            return np.concatenate([f.result() for f in futures])
+        raise ValueError(f"Unknown force mode: {self.force}")
+
+    def close(self):
+        """Shut down the worker pool of the 'parallel' mode"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def kinetic_energy(self):
+        return 0.5 * float(np.sum(self.mass * np.einsum('ij,ij->i', self.vel, self.vel)))
+
+    def potential_energy(self):
+        return potential_energy(self.pos, self.mass, self.G, self.softening)
+
+    def total_energy(self):
+        return self.kinetic_energy() + self.potential_energy()
+
+    def step(self, dt, integrator='leapfrog'):
+        """Advance one step of a drift-kick-drift composition scheme"""
+        drifts, kicks = INTEGRATORS[integrator]
+        for i, c in enumerate(drifts):
+            self.pos += c * dt * self.vel
+            if i < len(kicks):
+                self.vel += kicks[i] * dt * self.accelerations()
+        self.time += dt
+
+    def run(self, steps, dt, integrator='leapfrog', energy_every=None):
+        """
+        Integrate and report performance and energy conservation
+
+        Parameters:
+        energy_every (int): Steps between energy samples (default: only
+            at the start and end; each sample is an O(N^2) sum)
+
+        Returns:
+        dict: steps_per_second, energy_drift (max relative error of the
+        sampled energies) and the sampled energies
+        """
+        energies = [self.total_energy()]
+        elapsed = 0.0
+        for k in range(1, steps + 1):
+            start = time.perf_counter()
+            self.step(dt, integrator)
+            elapsed += time.perf_counter() - start
+            if (energy_every and k % energy_every == 0) or k == steps:
+                energies.append(self.total_energy())
+        energies = np.array(energies)
+        return {
+            'steps': steps,
+            'steps_per_second': steps / elapsed if elapsed > 0 else float('inf'),
+            'energy_drift': float(np.max(np.abs(energies / energies[0] - 1))),
+            'energies': energies,
+        }
+
+
+def plummer_sphere(n, total_mass=1.0, scale=1.0, G=1.0, seed=0):
+    """
+    Equilibrium Plummer model, a standard benchmark initial condition
+
+    Returns:
+    tuple: (positions, velocities, masses)
+    """
+    rng = np.random.default_rng(seed)
+    r = scale / np.sqrt(rng.uniform(0, 1, n) ** (-2 / 3) - 1)
+    direction = rng.normal(size=(n, 3))
+    pos = r[:, None] * direction / np.linalg.norm(direction, axis=1, keepdims=True)
+
+    # Von Neumann rejection for q = v / v_escape with g(q) = q^2 (1 - q^2)^3.5
+    q = np.empty(n)
+    pending = np.arange(n)
+    while pending.size:
+        x, y = rng.uniform(0, 1, pending.size), rng.uniform(0, 0.1, pending.size)
+        accept = y < x**2 * (1 - x**2) ** 3.5
+        q[pending[accept]] = x[accept]
+        pending = pending[~accept]
+    speed = q * np.sqrt(2 * G * total_mass / np.sqrt(r**2 + scale**2))
+    direction = rng.normal(size=(n, 3))
+    vel = speed[:, None] * direction / np.linalg.norm(direction, axis=1, keepdims=True)
+    return pos - pos.mean(axis=0), vel - vel.mean(axis=0), np.full(n, total_mass / n)
+
+
+def benchmark_force_modes(sizes=(256, 1024, 4096), steps=5, dt=1e-3, integrator='leapfrog',
+                          modes=('direct', 'barnes_hut', 'parallel'), theta=0.5):
+    """
+    Steps/sec and energy drift of each force mode on Plummer spheres
+
+    Returns:
+    list: One dict per (N, mode)
+    """
+    rows = []
+    for n in sizes:
+        pos, vel, mass = plummer_sphere(n)
+        for mode in modes:
+            system = NBodySystem(pos, vel, mass, G=1.0, softening=0.01, force=mode, theta=theta)
+            try:
+                report = system.run(steps, dt, integrator)
+            finally:
+                system.close()
+            rows.append({'N': n, 'mode': mode, 'steps_per_second': report['steps_per_second'],
+                         'energy_drift': report['energy_drift']})
+    return rows
+
+
+def main():
+    print(f"{'N':>6} {'mode':>11} {'steps/s':>10} {'dE/E':>10}")
+    for row in benchmark_force_modes():
+        print(f"{row['N']:>6} {row['mode']:>11} {row['steps_per_second']:>10.2f} {row['energy_drift']:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
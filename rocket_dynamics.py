@@ -0,0 +1,361 @@
+"""
+Variable-mass rocket trajectories by adaptive ODE integration
+
+The state is (x, y, vx, vy, m). Thrust acts along the launch angle at a
+constant mass flow until the fuel is spent, and quadratic drag uses an
+exponential atmosphere. Flight is integrated with DOP853 (or RK45) in a
+powered and a coasting phase split at the burnout event. The two dense
+outputs are joined, so a trajectory can be resampled at any dt without
+re-integrating.
+
+derivatives() broadcasts over trailing axes, so integrate_batch()
+advances whole trade studies as one (5, batch) system. Drag models that
+only accept scalars are run per trajectory in a process pool instead.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+G0 = 9.80665           # m/s^2
+RHO0 = 1.225           # kg/m^3, sea-level air density
+SCALE_HEIGHT = 8500.0  # m
+
+# Bump whenever the physics changes, so cached trajectories are invalidated
+MODEL_VERSION = 1
+
+STATE_FIELDS = ('x_position', 'y_position', 'x_velocity', 'y_velocity', 'masses')
+
+# scipy.integrate classes; scipy is imported on the first integration
+SOLVERS = ('DOP853', 'RK45')
+
+# Columns of the integrate_batch result
+SWEEP_DTYPE = np.dtype([
+    ('initial_velocity', float), ('launch_angle', float), ('initial_height', float),
+    ('payload_mass', float), ('fuel_mass', float),
+    ('flight_time', float), ('range', float), ('apogee', float), ('apogee_time', float),
+    ('burnout_time', float), ('burnout_velocity', float),
+])
+
+
+def air_density(y):
+    """Exponential atmosphere, clamped to sea level below y = 0"""
+    return RHO0 * np.exp(-np.maximum(y, 0.0) / SCALE_HEIGHT)
+
+
+def quadratic_drag(y, speed, drag_area):
+    """Drag force (N) 0.5 rho(y) Cd A v^2"""
+    return 0.5 * air_density(y) * drag_area * speed**2
+
+
+def derivatives(t, state, thrust, mass_flow, drag_area, pitch, drag_model=None, g=G0):
+    """
+    Right-hand side d(x, y, vx, vy, m)/dt
+
+    Parameters:
+    state (array): (5, ...) state; parameters broadcast against state[0]
+    thrust (float): Thrust (N), along the pitch angle
+    mass_flow (float): Propellant mass flow (kg/s)
+    drag_area (float): Drag coefficient times reference area (m^2)
+    pitch (float): Thrust direction from horizontal (radians)
+    drag_model (callable): (y, speed, drag_area) -> drag force (N);
+        defaults to quadratic_drag
+    """
+    x, y, vx, vy, m = state
+    speed = np.hypot(vx, vy)
+    force = (drag_model or quadratic_drag)(y, speed, drag_area)
+    drag = np.divide(force, speed, out=np.zeros_like(speed), where=speed > 0)
+    ax = (thrust * np.cos(pitch) - drag * vx) / m
+    ay = (thrust * np.sin(pitch) - drag * vy) / m - g
+    return np.stack(np.broadcast_arrays(vx, vy, ax, ay, np.zeros_like(m) - mass_flow))
+
+
+def _event(fn, terminal, direction):
+    fn.terminal = terminal
+    fn.direction = direction
+    return fn
+
+
+class RocketTrajectory:
+    """
+    Integrated flight with dense output
+
+    Attributes:
+    solution (OdeSolution): Continuous state over [0, flight_time]
+    events (dict): Times of 'burnout', 'apogee' and 'impact' (None if
+        not reached)
+    """
+
+    def __init__(self, solution, events):
+        self.solution = solution
+        self.events = events
+        self.flight_time = float(solution.t_max)
+
+    def __call__(self, t):
+        """State (5, ...) at time(s) t"""
+        return self.solution(t)
+
+    def sample(self, dt=0.1):
+        """
+        Resample the trajectory on a uniform grid
+
+        Returns:
+        dict: 'time' plus one array per STATE_FIELDS entry
+        """
+        n = int(np.floor(self.flight_time / dt)) + 1
+        time = np.empty(n)
+        time[:] = np.arange(n) * dt
+        states = self.solution(time)
+        return {'time': time, **dict(zip(STATE_FIELDS, states))}
+
+    def summary(self):
+        """Flight time, downrange distance, apogee and burnout state"""
+        start, end = self(0.0), self(self.flight_time)
+        apogee = self.events['apogee']
+        burnout = self.events['burnout']
+        return {
+            'flight_time': self.flight_time,
+            'range': float(end[0] - start[0]),
+            'apogee': float(self(apogee)[1]) if apogee is not None else float(max(start[1], end[1])),
+            'apogee_time': apogee,
+            'burnout_time': burnout,
+            'burnout_velocity': float(np.hypot(*self(burnout)[2:4])) if burnout is not None else None,
+        }
+
+
+def integrate_rocket(
+        initial_velocity=0,      # m/s
+        launch_angle=45,         # degrees
+        initial_height=0,        # meters
+        payload_mass=1000,       # kg
+        fuel_mass=50000,         # kg
+        burn_time=60,            # s
+        exhaust_velocity=3000,   # m/s
+        drag_area=0.5,           # m^2, Cd * A
+        method='DOP853',
+        rtol=1e-8,
+        atol=1e-6,
+        max_step=10.0,
+        t_max=3600.0,
+        drag_model=None
+        ):
+    """
+    Integrate a powered then coasting flight until ground impact
+
+    Parameters:
+    burn_time (float): Time to burn all fuel at constant mass flow
+    exhaust_velocity (float): Effective exhaust velocity; thrust is
+        mass_flow * exhaust_velocity
+    method (str): 'DOP853' or 'RK45'
+    max_step (float): Step size bound; keeps the long coasting steps from
+        overshooting into the atmosphere on re-entry
+    t_max (float): Give up after this much flight time
+    drag_model (callable): Optional drag force model, see derivatives()
+
+    Returns:
+    RocketTrajectory
+    """
+    from scipy.integrate import OdeSolution, solve_ivp
+
+    pitch = np.deg2rad(launch_angle)
+    state = np.array([
+        0.0,
+        initial_height,
+        initial_velocity * np.cos(pitch),
+        initial_velocity * np.sin(pitch),
+        payload_mass + fuel_mass,
+    ], dtype=float)
+
+    checks = {
+        'burnout': _event(lambda t, s, *args: s[4] - payload_mass, True, -1),
+        'apogee': _event(lambda t, s, *args: s[3], False, -1),
+        'impact': _event(lambda t, s, *args: s[1], True, -1),
+    }
+
+    phases = []
+    if fuel_mass > 0 and burn_time > 0:
+        mass_flow = fuel_mass / burn_time
+        phases.append(((mass_flow * exhaust_velocity, mass_flow), ('burnout', 'apogee', 'impact')))
+    phases.append(((0.0, 0.0), ('apogee', 'impact')))
+
+    t0 = 0.0
+    ts, interpolants = [np.array([t0])], []
+    events = dict.fromkeys(checks)
+    apogee_height = -np.inf
+    for (thrust, mass_flow), names in phases:
+        result = solve_ivp(
+            derivatives, (t0, t_max), state, method=method,
+            args=(thrust, mass_flow, drag_area, pitch, drag_model), events=[checks[name] for name in names],
+            dense_output=True, rtol=rtol, atol=atol, max_step=max_step
+        )
+        if not result.success:
+            raise RuntimeError(f"Trajectory integration failed: {result.message}")
+        ts.append(result.sol.ts[1:])
+        interpolants.extend(result.sol.interpolants)
+
+        found = dict(zip(names, zip(result.t_events, result.y_events)))
+        for t, s in zip(*found['apogee']):
+            if s[1] > apogee_height:
+                events['apogee'], apogee_height = float(t), s[1]
+        for name in ('burnout', 'impact'):
+            if name in found and found[name][0].size:
+                events[name] = float(found[name][0][0])
+        if events['impact'] is not None or result.t[-1] >= t_max:
+            break
+        t0, state = result.t[-1], result.y[:, -1]
+
+    return RocketTrajectory(OdeSolution(np.concatenate(ts), interpolants), events)
+
+
+def _bisect_roots(dense, rows, t_lo, t_hi, iterations=48):
+    """
+    Vectorized bisection for sign changes of dense(t)[rows[k]] on
+    [t_lo[k], t_hi[k]], positive at t_lo
+    """
+    columns = np.arange(rows.size)
+    for _ in range(iterations):
+        t_mid = 0.5 * (t_lo + t_hi)
+        positive = dense(t_mid)[rows, columns] > 0
+        t_lo = np.where(positive, t_mid, t_lo)
+        t_hi = np.where(positive, t_hi, t_mid)
+    return t_hi
+
+
+def _summarize_one(kwargs):
+    """Process-pool worker: scalar integration of one sweep row"""
+    summary = integrate_rocket(**kwargs).summary()
+    return tuple(np.nan if summary[key] is None else summary[key]
+                 for key in ('flight_time', 'range', 'apogee', 'apogee_time', 'burnout_time', 'burnout_velocity'))
+
+
+def integrate_batch(
+        initial_velocity=0,
+        launch_angle=45,
+        initial_height=0,
+        payload_mass=1000,
+        fuel_mass=50000,
+        burn_time=60,
+        exhaust_velocity=3000,
+        drag_area=0.5,
+        method='DOP853',
+        rtol=1e-8,
+        atol=1e-6,
+        max_step=10.0,
+        t_max=3600.0,
+        drag_model=None,
+        vectorized=True,
+        workers=None
+        ):
+    """
+    Integrate many trajectories as one (5, batch) system
+
+    Parameters broadcast to a common batch shape and take the same
+    meaning as in integrate_rocket. Burnouts are known in advance (fuel
+    runs out at burn_time), so the solver is restarted at each burnout
+    time; apogee and impact are located per rocket by bisection on the
+    dense output of the step where they occur. Landed rockets are dropped
+    (with a restart) right away, as their fall through sea-level air
+    would otherwise force tiny steps on the whole batch.
+
+    Parameters:
+    vectorized (bool): False if drag_model only accepts scalars; rows are
+        then integrated one by one with integrate_rocket in a process pool
+        (drag_model must be picklable)
+    workers (int): Pool size for the fallback (default: os.cpu_count())
+
+    Returns:
+    array: Flat structured array with SWEEP_DTYPE columns; missing events
+    (no burnout, no apogee) are NaN
+    """
+    columns = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in (
+        initial_velocity, launch_angle, initial_height, payload_mass, fuel_mass,
+        burn_time, exhaust_velocity, drag_area)))
+    v0, angle, h0, payload, fuel, burn, exhaust, area = (c.ravel() for c in columns)
+    n = v0.size
+
+    result = np.zeros(n, dtype=SWEEP_DTYPE)
+    for name, values in zip(SWEEP_DTYPE.names[:5], (v0, angle, h0, payload, fuel)):
+        result[name] = values
+
+    if not vectorized:
+        rows = [dict(initial_velocity=v0[k], launch_angle=angle[k], initial_height=h0[k],
+                     payload_mass=payload[k], fuel_mass=fuel[k], burn_time=burn[k],
+                     exhaust_velocity=exhaust[k], drag_area=area[k], method=method, rtol=rtol,
+                     atol=atol, max_step=max_step, t_max=t_max, drag_model=drag_model)
+                for k in range(n)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            summaries = list(pool.map(_summarize_one, rows, chunksize=max(1, n // (4 * (workers or 4)))))
+        for name, values in zip(SWEEP_DTYPE.names[5:], zip(*summaries)):
+            result[name] = values
+        return result
+
+    pitch = np.deg2rad(angle)
+    state = np.stack([np.zeros(n), h0, v0 * np.cos(pitch), v0 * np.sin(pitch), payload + fuel])
+    powered = (fuel > 0) & (burn > 0)
+    mass_flow = np.where(powered, fuel / np.where(powered, burn, 1.0), 0.0)
+    thrust = mass_flow * exhaust
+    burnout = np.where(powered, burn, np.inf)
+
+    result['apogee'] = h0
+    result['apogee_time'] = result['burnout_time'] = result['burnout_velocity'] = np.nan
+
+    active = np.arange(n)
+    t = 0.0
+    step = None
+    if method not in SOLVERS:
+        raise ValueError(f"Unknown solver: {method}")
+    import scipy.integrate
+    solver_class = getattr(scipy.integrate, method)
+    while active.size and t < t_max:
+        stop = min(t_max, burnout[active][burnout[active] > t].min(initial=np.inf))
+        k = active.size
+        args = (thrust[active], mass_flow[active], area[active], pitch[active], drag_model)
+
+        def fun(time, y, args=args, k=k):
+            return derivatives(time, y.reshape(5, k), *args).ravel()
+
+        # Restarts keep the previous step size instead of re-selecting one
+        solver = solver_class(fun, t, state[:, active].ravel(), stop, rtol=rtol, atol=atol,
+                              max_step=max_step, first_step=min(step, stop - t) if step else None)
+        landed = np.zeros(k, dtype=bool)
+        while solver.status == 'running' and not landed.any():
+            y_old = solver.y.reshape(5, k)
+            solver.step()
+            if solver.status == 'failed':
+                raise RuntimeError("Batch trajectory integration failed")
+            y_new = solver.y.reshape(5, k)
+            dense = solver.dense_output()
+
+            rising = np.flatnonzero((y_old[3] > 0) & (y_new[3] <= 0))
+            if rising.size:
+                root = _bisect_roots(dense, 3 * k + rising, np.full(rising.size, solver.t_old),
+                                     np.full(rising.size, solver.t))
+                height = dense(root)[k + rising, np.arange(rising.size)]
+                rows = active[rising]
+                higher = height > result['apogee'][rows]
+                result['apogee'][rows[higher]] = height[higher]
+                result['apogee_time'][rows[higher]] = root[higher]
+
+            falling = np.flatnonzero((y_old[1] >= 0) & (y_new[1] < 0))
+            if falling.size:
+                root = _bisect_roots(dense, k + falling, np.full(falling.size, solver.t_old),
+                                     np.full(falling.size, solver.t))
+                rows = active[falling]
+                result['flight_time'][rows] = root
+                result['range'][rows] = dense(root)[falling, np.arange(falling.size)]
+                landed[falling] = True
+
+        t = solver.t
+        step = solver.step_size or step
+        state[:, active] = solver.y.reshape(5, k)
+        if solver.status == 'finished':
+            spent = burnout[active] == t
+            rows = active[spent]
+            result['burnout_time'][rows] = t
+            result['burnout_velocity'][rows] = np.hypot(state[2, rows], state[3, rows])
+            thrust[rows] = mass_flow[rows] = 0.0
+            state[4, rows] = payload[rows]
+        active = active[~landed]
+
+    result['flight_time'][active] = t
+    result['range'][active] = state[0, active]
+    return result
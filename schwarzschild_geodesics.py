@@ -0,0 +1,275 @@
+"""
+Geodesics of the Schwarzschild metric
+
+Units are geometric (G = c = 1) and coordinates (t, r, theta, phi). The
+metric, its Christoffel symbols and the geodesic acceleration
+
+    d^2 x^mu / d lambda^2 = -Gamma^mu_ab u^a u^b
+
+are derived with sympy once per process and compiled to NumPy functions
+by lambdify (with common-subexpression elimination); later calls reuse
+the compiled functions from an lru_cache, so sympy is only paid for at
+the first use.
+
+Batches of null or timelike geodesics advance together with classical
+RK4. Every ray has its own affine step, proportional to its distance
+from the horizon, and rays are dropped from the batch once captured or
+escaped.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+CAPTURED = 1
+ESCAPED = 2
+
+
+@lru_cache(maxsize=None)
+def _symbolic():
+    """Coordinates, velocity and mass symbols, metric and Christoffels"""
+    import sympy as sp
+
+    t, r, theta, phi, M = sp.symbols('t r theta phi M', real=True)
+    coords = (t, r, theta, phi)
+    velocity = sp.symbols('u_t u_r u_theta u_phi', real=True)
+    f = 1 - 2 * M / r
+    g = sp.diag(-f, 1 / f, r**2, r**2 * sp.sin(theta)**2)
+    g_inv = g.inv()
+    gamma = [[[sp.simplify(sum(g_inv[mu, s] * (sp.diff(g[s, a], coords[b]) + sp.diff(g[s, b], coords[a])
+                                               - sp.diff(g[a, b], coords[s])) for s in range(4)) / 2)
+               for b in range(4)] for a in range(4)] for mu in range(4)]
+    return coords, velocity, M, g, gamma
+
+
+def _broadcasting(function, count):
+    """Wrap a lambdified function so constant outputs broadcast too"""
+    def evaluate(*args):
+        shape = np.broadcast(*args).shape
+        return [np.broadcast_to(value, shape) for value in function(*args)][:count]
+    return evaluate
+
+
+@lru_cache(maxsize=None)
+def compiled():
+    """
+    NumPy functions of the Schwarzschild geometry, compiled once
+
+    Returns:
+    dict: 'metric' (r, theta, M) -> 4 diagonal components,
+    'christoffel' (r, theta, M) -> {(mu, a, b): array} of the nonzero
+    symbols, and 'acceleration' (r, theta, u_t, u_r, u_theta, u_phi, M)
+    -> 4 components of d^2 x / d lambda^2
+    """
+    import sympy as sp
+
+    coords, velocity, M, g, gamma = _symbolic()
+    _, r, theta, _ = coords
+    args = (r, theta, M)
+
+    nonzero = {(mu, a, b): gamma[mu][a][b] for mu in range(4) for a in range(4) for b in range(4)
+               if gamma[mu][a][b] != 0}
+    keys = list(nonzero)
+    christoffel = _broadcasting(sp.lambdify(args, [nonzero[k] for k in keys], 'numpy', cse=True), len(keys))
+
+    acceleration = [-sum(gamma[mu][a][b] * velocity[a] * velocity[b] for a in range(4) for b in range(4))
+                    for mu in range(4)]
+    return {
+        'metric': _broadcasting(sp.lambdify(args, [g[k, k] for k in range(4)], 'numpy'), 4),
+        'christoffel': lambda r, theta, M=1.0: dict(zip(keys, christoffel(r, theta, M))),
+        'acceleration': _broadcasting(sp.lambdify((r, theta) + velocity + (M,), acceleration,
+                                                  'numpy', cse=True), 4),
+    }
+
+
+def static_frame_velocity(r, theta, direction, M=1.0, speed=1.0):
+    """
+    Four-velocity launched by a static observer
+
+    Parameters:
+    r, theta (array): Launch position, off the polar axis (the phi
+        basis vector is undefined at theta = 0 or pi)
+    direction (array): (..., 3) direction in the observer's orthonormal
+        (r, theta, phi) frame; normalized here
+    speed (array): Local speed; 1 gives a null geodesic with unit
+        locally measured energy, < 1 a timelike one (per unit rest mass)
+
+    Returns:
+    array: (..., 4) contravariant u
+    """
+    n = np.asarray(direction, dtype=float)
+    n = n / np.linalg.norm(n, axis=-1, keepdims=True)
+    r = np.asarray(r, dtype=float)
+    theta = np.asarray(theta, dtype=float)
+    if np.any(np.abs(np.sin(theta)) < 1e-12):
+        raise ValueError("Launch position on the polar axis: theta must not be 0 or pi")
+    speed = np.asarray(speed, dtype=float)
+    f = 1 - 2 * M / r
+    # Null rays have no rest mass; unit local energy stands in for gamma
+    timelike = speed < 1
+    gamma = np.ones(speed.shape)
+    np.divide(1, np.sqrt(1 - speed**2, where=timelike, out=np.ones(speed.shape)), out=gamma, where=timelike)
+    local_energy = gamma
+    local_momentum = gamma * speed
+    return np.stack(np.broadcast_arrays(
+        local_energy / np.sqrt(f),
+        local_momentum * n[..., 0] * np.sqrt(f),
+        local_momentum * n[..., 1] / r,
+        local_momentum * n[..., 2] / (r * np.sin(theta)),
+    ), axis=-1)
+
+
+def circular_orbit(r, M=1.0, theta=np.pi / 2):
+    """Equatorial circular-orbit four-velocity (r > 3M)"""
+    r = np.asarray(r, dtype=float)
+    norm = np.sqrt(1 - 3 * M / r)
+    return np.stack(np.broadcast_arrays(1 / norm, 0.0, 0.0, np.sqrt(M / r**3) / norm), axis=-1)
+
+
+def norm(x, u, M=1.0):
+    """g(u, u): 0 for null, -1 for unit timelike geodesics"""
+    g = compiled()['metric'](x[..., 1], x[..., 2], M)
+    return sum(g[k] * u[..., k]**2 for k in range(4))
+
+
+def integrate_geodesics(x0, u0, M=1.0, step=0.02, max_steps=20000, r_escape=None,
+                        horizon_margin=1e-3, record_every=0, callback=None):
+    """
+    Advance a batch of geodesics with per-ray RK4 steps
+
+    Parameters:
+    x0 (array): (B, 4) initial (t, r, theta, phi)
+    u0 (array): (B, 4) initial dx/d lambda
+    step (float): Affine step in units of (r - r_h) (scaled down near
+        the poles, where the coordinates are singular)
+    max_steps (int): Step limit for every ray
+    r_escape (float): Outgoing rays beyond this radius stop as escaped
+        (default: 1.01 times the largest starting radius, at least 50M)
+    horizon_margin (float): Rays inside (1 + margin) r_h stop as captured
+    record_every (int): Keep every k-th state of every ray (0: none)
+    callback: Called as callback(index, x_old, x_new) after each step
+        with the active ray indices, e.g. to detect plane crossings
+
+    Returns:
+    dict: 'x', 'u' final (B, 4) states, 'status' (0 running at the
+    step limit, CAPTURED or ESCAPED), 'steps' per ray, and with
+    recording 'trajectory' (B, S, 4) padded with NaN
+    """
+    x = np.array(x0, dtype=float, ndmin=2)
+    u = np.array(u0, dtype=float, ndmin=2)
+    B = x.shape[0]
+    r_h = 2 * M
+    if r_escape is None:
+        r_escape = max(1.01 * x[:, 1].max(), 50 * M)
+    accel = compiled()['acceleration']
+
+    def rhs(xs, us):
+        a = accel(xs[:, 1], xs[:, 2], us[:, 0], us[:, 1], us[:, 2], us[:, 3], M)
+        return us, np.stack(a, axis=-1)
+
+    status = np.zeros(B, dtype=np.int8)
+    steps = np.zeros(B, dtype=np.int64)
+    frames = []
+    active = np.arange(B)
+    for n in range(max_steps):
+        if not active.size:
+            break
+        xa, ua = x[active], u[active]
+        h = (step * np.maximum(xa[:, 1] - r_h, 1e-6 * M)
+             * np.clip(4 * np.abs(np.sin(xa[:, 2])), 0.05, 1.0))[:, None]
+        k1x, k1u = rhs(xa, ua)
+        k2x, k2u = rhs(xa + 0.5 * h * k1x, ua + 0.5 * h * k1u)
+        k3x, k3u = rhs(xa + 0.5 * h * k2x, ua + 0.5 * h * k2u)
+        k4x, k4u = rhs(xa + h * k3x, ua + h * k3u)
+        x_new = xa + h / 6 * (k1x + 2 * k2x + 2 * k3x + k4x)
+        u_new = ua + h / 6 * (k1u + 2 * k2u + 2 * k3u + k4u)
+        if callback is not None:
+            callback(active, xa, x_new)
+        x[active], u[active] = x_new, u_new
+        steps[active] += 1
+        if record_every and n % record_every == 0:
+            frame = np.full((B, 4), np.nan)
+            frame[active] = x_new
+            frames.append(frame)
+
+        captured = x_new[:, 1] < r_h * (1 + horizon_margin)
+        escaped = (x_new[:, 1] > r_escape) & (u_new[:, 1] > 0)
+        status[active[captured]] = CAPTURED
+        status[active[escaped]] = ESCAPED
+        active = active[~(captured | escaped)]
+
+    result = {'x': x, 'u': u, 'status': status, 'steps': steps}
+    if record_every:
+        result['trajectory'] = np.stack(frames, axis=1) if frames else np.empty((B, 0, 4))
+    return result
+
+
+def shadow_image(M=1.0, r_observer=50.0, inclination=np.radians(80), fov=None, resolution=128,
+                 disk=(6.0, 20.0), step=0.02, max_steps=20000):
+    """
+    Image of a Schwarzschild black hole seen by a static observer
+
+    Rays are traced backwards from every pixel of a pinhole camera
+    looking at the hole. The hole is spherically symmetric, so rays are
+    integrated in coordinates rotated to put the camera on their equator
+    and only the disk plane depends on the inclination; any inclination,
+    including a camera over the pole, launches off the coordinate axis.
+
+    Parameters:
+    r_observer (float): Camera radius (in M)
+    inclination (float): Camera polar angle in [0, pi] (0 is over the
+        pole, pi/2 in the disk plane)
+    fov (float): Full field of view in radians (default: twice the
+        analytic shadow size)
+    disk (tuple): Inner and outer radius of a thin equatorial disk whose
+        first crossing radius is recorded, or None
+
+    Returns:
+    dict: 'captured' (res, res) bool image (the shadow), 'disk_radius'
+    (radius where each ray first crosses the disk, NaN if none),
+    'alpha'/'beta' pixel angles, and 'shadow_angle', the analytic
+    angular radius asin(3 sqrt(3) M sqrt(1 - 2M/r) / r)
+    """
+    shadow_angle = np.arcsin(min(3 * np.sqrt(3) * M * np.sqrt(1 - 2 * M / r_observer) / r_observer, 1.0))
+    if fov is None:
+        fov = 4 * shadow_angle
+    axis = (np.arange(resolution) + 0.5) / resolution * fov - fov / 2
+    alpha, beta = np.meshgrid(axis, axis)
+    # Backward rays: inward radially, image up towards the north pole
+    direction = np.stack([-np.ones_like(alpha), -np.tan(beta), np.tan(alpha)], axis=-1).reshape(-1, 3)
+    B = direction.shape[0]
+    # Camera at (theta, phi) = (pi/2, 0) of the rotated coordinates; the
+    # rotation about the y axis maps the local (r, theta, phi) frame of
+    # the physical camera position onto the one there
+    x0 = np.zeros((B, 4))
+    x0[:, 1], x0[:, 2] = r_observer, np.pi / 2
+    u0 = static_frame_velocity(r_observer, np.pi / 2, direction, M)
+
+    disk_radius = np.full(B, np.nan)
+    if disk is not None:
+        # Height above the physical equator over r; the physical z axis
+        # is (cos i, 0, sin i) in the rotated coordinates
+        cos_i, sin_i = np.cos(inclination), np.sin(inclination)
+
+        def height(x):
+            return np.sin(x[:, 2]) * np.cos(x[:, 3]) * cos_i + np.cos(x[:, 2]) * sin_i
+
+        def cross(index, old, new):
+            h_old, h_new = height(old), height(new)
+            below = h_old * h_new <= 0
+            w = np.abs(h_old) / np.maximum(np.abs(h_old) + np.abs(h_new), 1e-300)
+            radius = old[:, 1] + w * (new[:, 1] - old[:, 1])
+            hit = below & (radius >= disk[0]) & (radius <= disk[1]) & np.isnan(disk_radius[index])
+            disk_radius[index[hit]] = radius[hit]
+    else:
+        cross = None
+
+    result = integrate_geodesics(x0, u0, M, step=step, max_steps=max_steps,
+                                 r_escape=1.01 * r_observer, callback=cross)
+    shape = (resolution, resolution)
+    return {
+        'captured': (result['status'] == CAPTURED).reshape(shape),
+        'disk_radius': disk_radius.reshape(shape),
+        'alpha': alpha,
+        'beta': beta,
+        'shadow_angle': shadow_angle,
+    }
@@ -0,0 +1,297 @@
+"""
+Symplectic integrators for the separable KeplerLRLSystem Hamiltonians
+
+H = |p|^2 / (2 mu) + V(r) with the Kepler (V = -k / r) or harmonic
+(V = k r^2 / 2) potential splits into a drift (r += c dt p / mu) and a
+kick (p -= d dt grad V). Every scheme is a symmetric drift-kick-drift
+composition in the (drifts, kicks) form of nbody.INTEGRATORS:
+
+- 'leapfrog': 2nd order
+- 'forest_ruth': 4th order triple jump (nbody's 'yoshida4')
+- 'yoshida6': 6th order, Yoshida's solution A (7 leapfrog stages)
+- 'yoshida8': 8th order, Yoshida's solution D (15 leapfrog stages)
+
+With regularized=True the Kepler problem is first mapped to a 4D
+harmonic oscillator by the Kustaanheimo-Stiefel (KS) transformation
+x = L(u) u, with fictitious time ds = dt / r. The same compositions then
+advance the oscillator Hamiltonian K = |w|^2 / 8 - h |u|^2 - k / mu = 0.
+In fictitious time the physical step shrinks at pericenter by itself,
+and close approaches no longer blow up the error. Physical time is
+integrated exactly along each drift.
+
+Batches of B initial conditions advance together in (B, 3) arrays that
+are updated in place. Every `every` steps the state is written to
+preallocated (S, B, ...) sample arrays, which may be memmaps, so long
+runs don't have to keep every step.
+"""
+import time
+
+import numpy as np
+
+
+def _triple_jump(weights):
+    """(drifts, kicks) of a symmetric composition of leapfrog steps"""
+    weights = list(weights[:0:-1]) + list(weights)
+    drifts = [weights[0] / 2]
+    drifts += [(a + b) / 2 for a, b in zip(weights, weights[1:])]
+    drifts.append(weights[-1] / 2)
+    return tuple(drifts), tuple(weights)
+
+
+def _centered(weights):
+    """Complete outer weights w_m, ..., w_1 with w_0 = 1 - 2 sum(w)"""
+    return (1 - 2 * sum(weights),) + tuple(weights)
+
+
+_FR = 1 / (2 - 2 ** (1 / 3))
+SCHEMES = {
+    'leapfrog': ((0.5, 0.5), (1.0,)),
+    'forest_ruth': _triple_jump((1 - 2 * _FR, _FR)),
+    'yoshida6': _triple_jump(_centered((-1.17767998417887, 0.235573213359357, 0.784513610477560))),
+    'yoshida8': _triple_jump(_centered((0.102799849391985, -1.96061023297549, 1.93813913762276,
+                                        -0.158240635368243, -1.44485223686048, 0.253693336566229,
+                                        0.914844246229740))),
+}
+
+
+def _kepler_force(r, k, out):
+    r2 = np.einsum('ij,ij->i', r, r)
+    np.multiply(r, (-k / (r2 * np.sqrt(r2)))[:, None], out=out)
+    return out
+
+
+def _harmonic_force(r, k, out):
+    np.multiply(r, -k, out=out)
+    return out
+
+
+# -grad V of the separable KeplerLRLSystem.hamiltonians
+POTENTIALS = {
+    'kepler': _kepler_force,
+    'harmonic': _harmonic_force,
+}
+
+
+def ks_from_cartesian(x, v):
+    """
+    KS coordinates of (B, 3) positions and velocities
+
+    Returns:
+    tuple: (u, w) as (B, 4) arrays, with w = 2 L(u)^T v the momentum
+    conjugate to u
+    """
+    x, v = np.asarray(x, dtype=float), np.asarray(v, dtype=float)
+    r = np.sqrt(np.einsum('ij,ij->i', x, x))
+    u = np.zeros((len(x), 4))
+    # Of the circle of equivalent u, pick the branch that avoids 0 / 0
+    upper = x[:, 0] >= 0
+    a = np.sqrt((r[upper] + x[upper, 0]) / 2)
+    u[upper, 0], u[upper, 1], u[upper, 2] = a, x[upper, 1] / (2 * a), x[upper, 2] / (2 * a)
+    lower = ~upper
+    b = np.sqrt((r[lower] - x[lower, 0]) / 2)
+    u[lower, 1], u[lower, 0], u[lower, 3] = b, x[lower, 1] / (2 * b), x[lower, 2] / (2 * b)
+
+    u1, u2, u3, u4 = u.T
+    v1, v2, v3 = v.T
+    w = 2 * np.stack([
+        u1 * v1 + u2 * v2 + u3 * v3,
+        -u2 * v1 + u1 * v2 + u4 * v3,
+        -u3 * v1 - u4 * v2 + u1 * v3,
+        u4 * v1 - u3 * v2 + u2 * v3,
+    ], axis=1)
+    return u, w
+
+
+def ks_to_cartesian(u, w):
+    """Positions and velocities (B, 3) of KS coordinates (B, 4)"""
+    u1, u2, u3, u4 = u.T
+    w1, w2, w3, w4 = w.T
+    x = np.stack([
+        u1 * u1 - u2 * u2 - u3 * u3 + u4 * u4,
+        2 * (u1 * u2 - u3 * u4),
+        2 * (u1 * u3 + u2 * u4),
+    ], axis=1)
+    r = np.einsum('ij,ij->i', u, u)
+    v = np.stack([
+        u1 * w1 - u2 * w2 - u3 * w3 + u4 * w4,
+        u2 * w1 + u1 * w2 - u4 * w3 - u3 * w4,
+        u3 * w1 + u4 * w2 + u1 * w3 + u2 * w4,
+    ], axis=1) / (2 * r)[:, None]
+    return x, v
+
+
+def _samples(out, count, B):
+    if out is None:
+        out = {}
+    out.setdefault('r', np.empty((count, B, 3)))
+    out.setdefault('p', np.empty((count, B, 3)))
+    out.setdefault('t', np.empty((count, B)))
+    for name, shape in (('r', (count, B, 3)), ('p', (count, B, 3)), ('t', (count, B))):
+        if out[name].shape != shape:
+            raise ValueError(f"Sample array '{name}' must have shape {shape}")
+    return out
+
+
+def integrate(r, p, dt, steps, scheme='leapfrog', potential='kepler', mu=1.0, k=1.0,
+              regularized=False, every=0, out=None):
+    """
+    Advance a batch of phase-space points in place
+
+    Parameters:
+    r, p (array): (B, 3) float64 positions and momenta, overwritten with
+        the final state
+    dt (float or array): Time step, scalar or per trajectory (B,). With
+        regularized=True the fictitious step is dt / a (a the semi-major
+        axis, r for unbound orbits), so a bound orbit takes as many steps
+        per period as without regularization
+    steps (int): Number of steps
+    scheme (str): Key of SCHEMES
+    potential (str): Key of POTENTIALS
+    mu, k (float): Mass and force constant of KeplerLRLSystem
+    regularized (bool): Integrate the Kepler problem in KS variables
+    every (int): Record every k-th step (0: no samples); the initial
+        state is sample 0
+    out (dict): Preallocated 'r', 'p' (S, B, 3) and 't' (S, B) sample
+        arrays, S = steps // every + 1 (e.g. memmaps)
+
+    Returns:
+    dict: 'r', 'p' final states, 't' (B,) elapsed physical time, and
+    'samples' ({'r', 'p', 't'}) when recording
+    """
+    if r.dtype != np.float64 or p.dtype != np.float64:
+        raise TypeError("r and p are updated in place and must be float64 arrays")
+    drifts, kicks = SCHEMES[scheme]
+    if potential not in POTENTIALS:
+        raise ValueError(f"No separable force for the {potential!r} Hamiltonian")
+    if regularized and potential != 'kepler':
+        raise ValueError("KS regularization applies to the Kepler potential only")
+    B = len(r)
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), (B,))
+    t = np.zeros(B)
+    samples = _samples(out, steps // every + 1, B) if every else None
+
+    if regularized:
+        _integrate_ks(r, p, dt, steps, drifts, kicks, mu, k, t, every, samples)
+    else:
+        force = POTENTIALS[potential]
+        h = dt[:, None]
+        buffer = np.empty_like(r)
+        if samples is not None:
+            samples['r'][0], samples['p'][0], samples['t'][0] = r, p, t
+        for n in range(1, steps + 1):
+            for i, c in enumerate(drifts):
+                r += (c / mu) * h * p
+                if i < len(kicks):
+                    p += kicks[i] * h * force(r, k, buffer)
+            t += dt
+            if samples is not None and n % every == 0:
+                s = n // every
+                samples['r'][s], samples['p'][s], samples['t'][s] = r, p, t
+
+    result = {'r': r, 'p': p, 't': t}
+    if samples is not None:
+        result['samples'] = samples
+    return result
+
+
+def _integrate_ks(r, p, dt, steps, drifts, kicks, mu, k, t, every, samples):
+    """Composition steps on the KS oscillator K = |w|^2/8 - h|u|^2 - k/mu"""
+    gm = k / mu
+    v = p / mu
+    distance = np.sqrt(np.einsum('ij,ij->i', r, r))
+    # Energy per unit mass, conserved exactly by the Kepler flow
+    h = np.einsum('ij,ij->i', v, v) / 2 - gm / distance
+    bound = h < 0
+    scale = distance.copy()
+    scale[bound] = gm / (-2 * h[bound])
+    ds = (dt / scale)[:, None]
+    u, w = ks_from_cartesian(r, v)
+
+    def record(s):
+        x, velocity = ks_to_cartesian(u, w)
+        samples['r'][s], samples['p'][s], samples['t'][s] = x, mu * velocity, t
+
+    if samples is not None:
+        record(0)
+    kick = 2 * h[:, None] * ds
+    for n in range(1, steps + 1):
+        for i, c in enumerate(drifts):
+            # t' = |u|^2 along the drift u + sigma w / 4, integrated exactly
+            tau = c * ds[:, 0]
+            t += (tau * np.einsum('ij,ij->i', u, u) + tau**2 * np.einsum('ij,ij->i', u, w) / 4
+                  + tau**3 * np.einsum('ij,ij->i', w, w) / 48)
+            u += (c / 4) * ds * w
+            if i < len(kicks):
+                w += kicks[i] * kick * u
+        if samples is not None and n % every == 0:
+            record(n // every)
+    x, velocity = ks_to_cartesian(u, w)
+    r[...] = x
+    p[...] = mu * velocity
+
+
+def kepler_orbits(batch, eccentricity=0.6, a=1.0, mu=1.0, k=1.0, seed=0):
+    """
+    Bound Kepler orbits started at pericenter, randomly oriented
+
+    Returns:
+    tuple: (r, p) (batch, 3) arrays and the period
+    """
+    rng = np.random.default_rng(seed)
+    normal = rng.normal(size=(batch, 3))
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True)
+    along = np.cross(normal, rng.normal(size=(batch, 3)))
+    along /= np.linalg.norm(along, axis=1, keepdims=True)
+    gm = k / mu
+    r_peri = a * (1 - eccentricity)
+    speed = np.sqrt(gm * (1 + eccentricity) / r_peri)
+    r = r_peri * along
+    p = mu * speed * np.cross(normal, along)
+    return r, p, 2 * np.pi * np.sqrt(a**3 / gm)
+
+
+def benchmark_schemes(batch=256, orbits=20, steps_per_orbit=256, eccentricity=0.6, every=64,
+                      schemes=tuple(SCHEMES), regularized=(False, True)):
+    """
+    Steps/sec and conserved-quantity drift of each scheme on Kepler orbits
+
+    Returns:
+    list: One dict per (scheme, regularized) with 'steps_per_second' (of
+    the whole batch), 'lrl_drift' (max |A - A_0| / |A_0| over the
+    samples) and 'energy_drift' (max relative energy error)
+    """
+    from KeplerLRLSystem import KeplerLRLSystem
+
+    system = KeplerLRLSystem()
+    r0, p0, period = kepler_orbits(batch, eccentricity, mu=system.mu, k=system.k)
+    dt = period / steps_per_orbit
+    steps = orbits * steps_per_orbit
+    rows = []
+    for ks in regularized:
+        for scheme in schemes:
+            r, p = r0.copy(), p0.copy()
+            start = time.perf_counter()
+            result = system.evolve(r, p, dt, steps, scheme, regularized=ks, every=every)
+            wall = time.perf_counter() - start
+            samples = result['samples']
+            invariants = system.invariants(samples['r'], samples['p'])
+            A, energy = invariants['A'], invariants['energy']
+            lrl = np.linalg.norm(A - A[:1], axis=-1) / np.linalg.norm(A[:1], axis=-1)
+            rows.append({
+                'scheme': ('ks+' if ks else '') + scheme,
+                'steps_per_second': steps / wall,
+                'lrl_drift': float(lrl.max()),
+                'energy_drift': float(np.max(np.abs(energy / energy[:1] - 1))),
+            })
+    return rows
+
+
+def main():
+    print(f"{'scheme':>16} {'steps/s':>10} {'|dA|/A':>10} {'dE/E':>10}")
+    for row in benchmark_schemes():
+        print(f"{row['scheme']:>16} {row['steps_per_second']:>10.1f} "
+              f"{row['lrl_drift']:>10.2e} {row['energy_drift']:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
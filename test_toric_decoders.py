@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from toric_decoders import get_decoder
+from toric_stabilizers import lattice_syndromes
+
+
+DECODERS = ['mwpm', 'union_find']
+KINDS = ['x', 'z']
+
+
+def _syndrome(kind, error):
+    star, plaquette = lattice_syndromes(
+        error if kind == 'x' else None, error if kind == 'z' else None
+    )
+    return plaquette if kind == 'x' else star
+
+
+@pytest.mark.parametrize('name', DECODERS)
+@pytest.mark.parametrize('kind', KINDS)
+def test_odd_syndrome_rejected(name, kind):
+    syndrome = np.zeros((5, 5), dtype=np.uint8)
+    syndrome[1, 2] = 1
+    decoder = get_decoder(name)
+    with pytest.raises(ValueError):
+        decoder.decode(syndrome, kind)
+    with pytest.raises(ValueError):
+        decoder.decode_batch(np.stack([np.zeros_like(syndrome), syndrome]), kind)
+    assert decoder.timings == []
+
+
+@pytest.mark.parametrize('name', DECODERS)
+@pytest.mark.parametrize('kind', KINDS)
+def test_even_syndrome_cleared(name, kind):
+    L = 6
+    error = (np.random.default_rng(1).random((2 * L, L)) < 0.05).astype(np.uint8)
+    syndrome = _syndrome(kind, error)
+    residual = error ^ get_decoder(name).decode(syndrome, kind)
+    assert not _syndrome(kind, residual).any()
@@ -1,79 +1,61 @@
-def toric_code_hamiltonian(vertex_ops, plaquette_ops): H = - sum(vertex_ops) - sum(plaquette_ops) return H
+def toric_code_hamiltonian(vertex_ops, plaquette_ops):
+    H = - sum(vertex_ops) - sum(plaquette_ops)
+    return H
 
-def topological_invariant(coordinates, momentum, H): # First Chern number calculation berry_curvature = calculate_berry_curvature(coordinates, momentum) chern_number = integrate_over_brillouin_zone(berry_curvature) return 
+def topological_invariant(coordinates, momentum, H):
+    # First Chern number calculation
+    berry_curvature = calculate_berry_curvature(coordinates, momentum)
+    chern_number = integrate_over_brillouin_zone(berry_curvature)
+    return chern_number
 
 import numpy as np
 from scipy.sparse import csr_matrix
+from toric_stabilizers import stabilizer_tables
+from toric_hamiltonian import sparse_hamiltonian, hamiltonian_operator, ground_state_degeneracy
+from chern_number import chern_number
+
 def create_toric_code(L):
     """
     Create L x L toric code Hamiltonian
+
+    Returns the stabilizer terms as a list of qubit-index lists, the
+    star and plaquette of each site interleaved. This is a view over
+    the array tables of toric_stabilizers.stabilizer_tables(L), which
+    should be used directly for anything performance sensitive.
     """
-    N = 2 * L * L  # Number of qubits
-
-    # Vertex operators (star)
-    def vertex_operator(i, j):
-        ops = []
-        # Add X operators around vertex
-        for dx, dy in [(0,0), (0,-1), (-1,0), (-1,-1)]:
-            idx = 2 * ((i+dx)%L * L + (j+dy)%L)
-            ops.append(idx)
-        return ops
-
-    # Plaquette operators (plaque)
-    def plaquette_operator(i, j):
-        ops = []
-        # Add Z operators around plaquette
-        for dx, dy in [(0,0), (1,0), (0,1), (1,1)]:
-            idx = 2 * ((i+dx)%L * L + (j+dy)%L) + 1
-            ops.append(idx)
-        return ops
-    # Build Hamiltonian terms
-    terms = []
-    for i in range(L):
-        for j in range(L):
-            terms.append(vertex_operator(i,j))
-            terms.append(plaquette_operator(i,j))
-
-    return terms
-
-def compute_topological_invariants(L, ground_state):
+    return stabilizer_tables(L).terms()
+
+def compute_topological_invariants(L, ground_state, bloch_hamiltonian=None):
     """
     Compute topological invariants:
     - Wilson loops
     - Ground state degeneracy
-    - Chern number
+    - Chern number (Fukui-Hatsugai-Suzuki on an L x L Brillouin zone,
+      if a Bloch Hamiltonian H(kx, ky) is given; the toric code itself
+      has none and gives 0)
     """
     # Wilson loops along non-contractible cycles
     def wilson_loop_x(state, i):
         # Horizontal non-contractible loop
-        loop_ops = [2iL + 2*j + 1 for j in range(L)]
+        loop_ops = [2*i*L + 2*j + 1 for j in range(L)]
         return np.prod([state[idx] for idx in loop_ops])
 
     def wilson_loop_y(state, j):
         # Vertical non-contractible loop
-        loop_ops = [2iL + 2*j + 1 for i in range(L)]
+        loop_ops = [2*i*L + 2*j + 1 for i in range(L)]
         return np.prod([state[idx] for idx in loop_ops])
 
     # Calculate invariants
     w_x = [wilson_loop_x(ground_state, i) for i in range(L)]
     w_y = [wilson_loop_y(ground_state, j) for j in range(L)]
 
-    # Chern number calculation via Berry curvature
-    def berry_curvature(k1, k2):
-        # Implement Berry curvature calculation
-        pass
-
-    chern = 0
-    # Integrate Berry curvature
-    dk = 2np.pi/L
-    for k1 in range(L):
-        for k2 in range(L):
-            chern += berry_curvature(k1dk, k2*dk)
+    # Chern number from the lattice Berry curvature
+    chern = 0 if bloch_hamiltonian is None else chern_number(bloch_hamiltonian, L)
 
     return {
         'wilson_x': w_x,
         'wilson_y': w_y,
-        'chern': chern/(2*np.pi),
+        'chern': chern,
         'degeneracy': 4  # On torus
     }
 
@@ -82,7 +64,7 @@ def hamiltonianevolution(state, terms, steps):
     Time evolution under toric code Hamiltonian
     """
     dt = 0.01
-    for  in range(steps):
+    for _ in range(steps):
         # Trotter decomposition
         for term in terms:
             # Apply stabilizer terms
@@ -92,40 +74,119 @@ def hamiltonianevolution(state, terms, steps):
 import numpy as np
 from scipy.sparse import csr_matrix
 import networkx as nx
+from toric_decoders import get_decoder, path_edges, torus_displacement
+from toric_stabilizers import lattice_syndromes
+from toric_tableau import ToricTableau, dense_ground_state, dense_apply_string, dense_wilson_loops
+from anyon_registry import lattice_anyon_codes, toric_code_registry
+from modular_data import quantum_double
+from toric_braiding import ragged_paths, intersection_counts, braiding_phases
+from chern_number import chern_number
 class ToricCodeAnyons:
-    def init(self, L):
+    """
+    Anyons of the L x L toric code as X and Z edge flips
+
+    Conventions follow anyon_registry: e anyons are star (vertex) defects,
+    created in pairs by Z strings; m anyons are plaquette defects,
+    created by X strings on the dual lattice.
+    """
+    def __init__(self, L, decoder='union_find'):
         self.L = L
-        self.lattice = np.zeros((2L, 2L))  # Dual lattice for e/m anyons
+        # Edge flips, toric_stabilizers.to_lattice layout
+        self.lattice = np.zeros((2*L, L), dtype=np.uint8)    # X flips (m strings)
+        self.z_lattice = np.zeros((2*L, L), dtype=np.uint8)  # Z flips (e strings)
+        self.decoder = get_decoder(decoder) if isinstance(decoder, str) else decoder
 
     def create_anyon_pair(self, type='e', pos1=(0,0), pos2=(0,1)):
-        """Create e or m anyon pair"""
+        """Create an e pair on vertices pos1, pos2 or an m pair on plaquettes"""
         if type == 'e':
-            self._apply_string_X(pos1, pos2)
-        else:  # m-type
             self._apply_string_Z(pos1, pos2)
+        elif type == 'm':
+            self._apply_string_X(pos1, pos2)
+        else:
+            raise ValueError(f"Unknown anyon type: {type}")
 
-    def applystring_X(self, start, end):
-        """Apply X string operator between vertices"""
-        path = self._shortest_path(start, end)
-        for pos in path:
+    def _apply_string_X(self, start, end):
+        """Apply X string operator between plaquettes"""
+        for pos in self._shortest_path(start, end, 'x'):
             self.lattice[pos] ^= 1  # Toggle spin
 
+    def _apply_string_Z(self, start, end):
+        """Apply Z string operator between vertices"""
+        for pos in self._shortest_path(start, end, 'z'):
+            self.z_lattice[pos] ^= 1
+
+    def _shortest_path(self, start, end, kind='x'):
+        """Lattice positions of a shortest string between two sites on the torus"""
+        edges = path_edges(self.L, kind, start, torus_displacement(start, end, self.L))
+        return list(zip(*np.divmod(edges, self.L)))
+
+    def syndromes(self):
+        """(star, plaquette) syndromes, i.e. e and m occupation per site"""
+        return lattice_syndromes(self.lattice, self.z_lattice)
+
+    def anyon_positions(self, type=None):
+        """Sites holding an anyon of one type, or {'e': ..., 'm': ...}"""
+        star, plaquette = self.syndromes()
+        positions = {
+            'e': [tuple(pos) for pos in np.argwhere(star).tolist()],
+            'm': [tuple(pos) for pos in np.argwhere(plaquette).tolist()],
+        }
+        return positions if type is None else positions[type]
+
+    def decode_anyons(self, kind=None):
+        """
+        Pair up and annihilate anyons with self.decoder
+
+        Parameters:
+        kind (str): 'x' corrects X flips (m anyons on plaquettes), 'z'
+            corrects Z flips (e anyons on vertices), None does both
+
+        Returns:
+        float: Decode time in seconds
+        """
+        if kind is None:
+            return self.decode_anyons('x') + self.decode_anyons('z')
+        star, plaquette = self.syndromes()
+        if kind == 'x':
+            self.lattice ^= self.decoder.decode(plaquette, 'x')
+        elif kind == 'z':
+            self.z_lattice ^= self.decoder.decode(star, 'z')
+        else:
+            raise ValueError(f"Unknown decode kind: {kind}")
+        return self.decoder.timings[-1][1]
+
     def braidingphase(self, e_path, m_path):
         """Calculate statistical phase from braiding"""
         intersections = self._count_intersections(e_path, m_path)
         return (-1)**intersections
 
+    def _count_intersections(self, e_path, m_path):
+        """Edges shared by an e path (vertices, Z string) and an m path (plaquettes, X string)"""
+        return int(intersection_counts(ragged_paths([m_path]), ragged_paths([e_path]), self.L)[0, 0])
+
+    def braiding_phases(self, e_paths, m_paths, pairs=None):
+        """
+        Braiding phases of many (e path, m path) pairs; paths are lists
+        of sites or toric_braiding (offsets, coords) ragged arrays.
+        Entry [i, j] pairs e path i (vertices) with m path j (plaquettes)
+        """
+        if not isinstance(e_paths, tuple):
+            e_paths = ragged_paths(e_paths)
+        if not isinstance(m_paths, tuple):
+            m_paths = ragged_paths(m_paths)
+        if pairs is not None:
+            pairs = np.asarray(pairs)[..., ::-1]
+            return braiding_phases(m_paths, e_paths, self.L, pairs)
+        return braiding_phases(m_paths, e_paths, self.L).T
+
     def measure_wilson_loop(self, loop_path):
-        """Measure Wilson loop operator"""
-        phase = 1
-        for pos in loop_path:
-            if self.lattice[pos]:
-                phase *= -1
-        return phase
+        """Measure Wilson loop operator of the X flips"""
+        rows, cols = np.asarray(loop_path, dtype=np.intp).reshape(-1, 2).T
+        return 1 - 2 * int(np.bitwise_xor.reduce(self.lattice[rows, cols]))
     def ground_state_sectors(self):
         """Calculate topological ground state sectors"""
         w1 = self.measure_wilson_loop([(i,0) for i in range(self.L)])
-        w2 = self.measure_wilson_loop([(0,j) for j in range(self.L)])
+        w2 = self.measure_wilson_loop([(self.L,j) for j in range(self.L)])
         return (w1, w2)
 
 def fusion_rules():
@@ -139,14 +200,35 @@ def fusion_rules():
     return rules
 
 class ToricTQFT(ToricCodeAnyons):
-   def __init__(self, L):
-       super().__init__(L)
-       self.ground_state = self._initialize_ground_state()
+    def __init__(self, L, backend='tableau'):
+        super().__init__(L)
+        self.backend = backend
+        self.ground_state = self._initialize_ground_state()
+
+    def _initialize_ground_state(self):
+        """Initialize ground state as +1 eigenstate of all stabilizers
 
-    def initializeground_state(self):
-        """Initialize ground state as +1 eigenstate of all stabilizers"""
-        N = 2 * self.L * self.L
-        return np.ones(N) / np.sqrt(2**N)
+        backend='tableau' gives a ToricTableau (polynomial memory);
+        backend='dense' a 2^(2L^2) statevector, for cross-checks at tiny L.
+        """
+        if self.backend == 'dense':
+            return dense_ground_state(self.L)
+        if self.backend == 'tableau':
+            return ToricTableau(self.L)
+        raise ValueError(f"Unknown backend: {self.backend}")
+
+    def apply_anyon_string(self, kind, start, end):
+        """Apply an X ('x') or Z ('z') string operator to the ground state"""
+        if self.backend == 'dense':
+            self.ground_state = dense_apply_string(self.ground_state, self.L, kind, start, end)
+        else:
+            self.ground_state.apply_string(kind, start, end)
+
+    def _wilson_loops(self):
+        """Non-contractible Wilson loop expectation values of the current state"""
+        if self.backend == 'dense':
+            return dense_wilson_loops(self.ground_state, self.L)
+        return self.ground_state.wilson_loops()
 
     def anyonic_braiding_statistics(self, a1_path, a2_path):
         """
@@ -156,16 +238,14 @@ class ToricTQFT(ToricCodeAnyons):
         crossings = self._calculate_linking_number(a1_path, a2_path)
         return np.exp(1j * np.pi * crossings)
 
+    def _calculate_linking_number(self, a1_path, a2_path):
+        """Crossings of an X-string (plaquette) path a1 with a Z-string (vertex) path a2"""
+        return self._count_intersections(a2_path, a1_path)
+
     def modular_matrices(self):
         """S and T matrices encoding braiding/spin statistics"""
-        # Basis: {1, e, m, em}
-        S = 0.5 * np.array([[1, 1, 1, 1],
-                           [1, 1, -1, -1],
-                           [1, -1, 1, -1],
-                           [1, -1, -1, 1]])
-
-        T = np.diag([1, 1, 1, -1])  # Topological spins
-        return S, T
+        # Basis: {1, e, m, em}, the anyon order of D(Z2) in modular_data
+        return quantum_double(2).modular_matrices()
 
     def fusion_channels(self, a1, a2):
         rules = {
@@ -176,9 +256,15 @@ class ToricTQFT(ToricCodeAnyons):
             ('em','m'): ['e']
         }
         return rules.get((a1, a2), [])
-    def calculate_invariants(self):
-        """Compute topological invariants"""
-        chern = self._chern_number()
+    def calculate_invariants(self, bloch_hamiltonian=None):
+        """
+        Compute topological invariants
+
+        The Chern number is chern_number.chern_number on an L x L
+        Brillouin zone if a Bloch Hamiltonian H(kx, ky) is given; the
+        toric code itself has none and gives 0.
+        """
+        chern = 0 if bloch_hamiltonian is None else chern_number(bloch_hamiltonian, self.L)
         wilson = self._wilson_loops()
         return {
             'chern': chern,
@@ -195,7 +281,7 @@ Here is how you can use decorators and a concept similar to partial classes:
 In Python, you can use comment blocks for documentation or explanation purposes. While Python does not have a specific "comment block" syntax (like /* */ in other languages), you can use:
 
 Multiple Line Comments: Use # for each line.
-Docstrings: Use triple quotes (""" """ or ''' ''') for block comments inside functions, classes, or modules.
+Docstrings: Use triple quotes (\"\"\" \"\"\" or ''' ''') for block comments inside functions, classes, or modules.
 
 # This is a comment block explaining the next part of the code.
 # You can use multiple `#` symbols to create a comment block.
@@ -212,12 +298,12 @@ y = 20  # Another variable
 
 
     def add_numbers(a, b):
-        """
+        \"\"\"
         This function adds two numbers and returns the result.
         Arguments:
         - a: First number
         - b: Second number
-        """
+        \"\"\"
         return a + b
 
 """
@@ -325,3 +411,44 @@ class AnyonFusion:
                    left = sum([self.fuse(x,c) for x in self.fuse(a,b)],[])
                    right = sum([self.fuse(a,y) for y in self.fuse(b,c)],[])
                    assert sorted(left) == sorted(right)
+
+@partial_class
+class AnyonFusion:
+   registry = toric_code_registry()  # Integer codes in the order {1, e, m, em}
+
+   def fusion_tensor(self):
+       """N^c_ab fusion coefficients, indexed by registry codes"""
+       return self.registry.N.astype(float)
+
+   def fuse_codes(self, a, b):
+       """Vectorized fusion of anyon code arrays"""
+       return self.registry.fuse(a, b)
+
+   def total_charge(self, codes, axis=-1):
+       """Fuse a whole population of anyon codes down to one code"""
+       return self.registry.fuse_all(codes, axis)
+
+   def lattice_charge(self, anyons, region=None):
+       """
+       Topological charge of a ToricCodeAnyons configuration
+
+       Site (i, j) holds vertex (i, j) (e) and plaquette (i, j) (m). On
+       the closed torus all anyons together always fuse to the vacuum,
+       so charges are reported per site or for a region.
+
+       Parameters:
+       region (array): (L, L) boolean mask or index into the sites; None
+           returns the per-site codes
+
+       Returns:
+       array or int: (L, L) registry codes, or the fused code of the region
+       """
+       star, plaquette = anyons.syndromes()
+       codes = lattice_anyon_codes(star, plaquette)
+       if region is None:
+           return codes
+       return int(self.registry.fuse_all(np.ravel(codes[region])))
+
+   def verify_associativity(self):
+       """Verify (a×b)×c = a×(b×c)"""
+       assert self.registry.verify_associativity()
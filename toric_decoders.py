@@ -0,0 +1,474 @@
+"""
+Syndrome decoders for the toric code
+
+Decoders take syndromes in the (L, L) vertex / plaquette layout of
+toric_stabilizers.lattice_syndromes and return corrections in the
+(2L, L) edge-lattice layout. kind='z' decodes star syndromes (Z errors),
+kind='x' decodes plaquette syndromes (X errors).
+"""
+import time
+from functools import lru_cache
+
+import networkx as nx
+import numpy as np
+
+# For each lattice axis: (edge direction d, (di, dj) offset) of the edge
+# crossed when a defect moves one step forward along that axis
+STEPS = {
+    'z': ((0, (0, 0)), (1, (0, 0))),
+    'x': ((1, (1, 0)), (0, (0, 1))),
+}
+
+
+@lru_cache(maxsize=None)
+def _shifts_by_radius(L):
+    """
+    Canonical torus displacements (one of each +/-v pair), grouped by
+    Manhattan distance and signed to the shortest way around
+    """
+    seen = set()
+    groups = {}
+    for dx in range(L):
+        for dy in range(L):
+            if (dx, dy) == (0, 0):
+                continue
+            key = min((dx, dy), ((-dx) % L, (-dy) % L))
+            if key in seen:
+                continue
+            seen.add(key)
+            sx = dx if dx <= L // 2 else dx - L
+            sy = dy if dy <= L // 2 else dy - L
+            groups.setdefault(abs(sx) + abs(sy), []).append((sx, sy))
+    return tuple(tuple(groups[r]) for r in sorted(groups))
+
+
+def flip_paths(correction, starts, shift, kind):
+    """
+    XOR the edges of a straight L-shaped path from every start into correction
+
+    Parameters:
+    correction (array): (n, 2, L, L) uint8, updated in place
+    starts (array): (n, L, L) bool mask of path origins
+    shift (tuple): Signed displacement (sx, sy) to the path end
+    kind (str): 'x' or 'z', selecting the dual or primal lattice
+    """
+    position = starts
+    for axis, steps in enumerate(shift):
+        d, offset = STEPS[kind][axis]
+        for _ in range(abs(steps)):
+            if steps < 0:
+                position = np.roll(position, -1, axis=1 + axis)
+            correction[:, d] ^= np.roll(position, offset, axis=(1, 2))
+            if steps > 0:
+                position = np.roll(position, 1, axis=1 + axis)
+
+
+def torus_displacement(start, end, L):
+    """
+    Signed shortest displacement from start to end on the L x L torus
+    """
+    delta = (np.asarray(end) - np.asarray(start)) % L
+    return np.where(delta > L // 2, delta - L, delta)
+
+
+def path_edges(L, kind, start, shift):
+    """
+    Flat (2L, L)-lattice indices of the edges on a straight L-shaped path
+
+    Parameters:
+    L (int): Lattice size
+    kind (str): 'x' (path between plaquettes) or 'z' (between vertices)
+    start (tuple): Start vertex / plaquette (i, j)
+    shift (tuple): Signed displacement (sx, sy), moved along i first
+
+    Returns:
+    array: Edge indices (d*L + i)*L + j, one per step
+    """
+    position = np.array(start, dtype=np.int64)
+    edges = []
+    for axis, steps in enumerate(shift):
+        d, offset = STEPS[kind][axis]
+        k = np.arange(abs(int(steps)))
+        cells = np.repeat(position[None], k.size, axis=0)
+        cells[:, axis] += k if steps > 0 else -1 - k
+        i = (cells[:, 0] + offset[0]) % L
+        j = (cells[:, 1] + offset[1]) % L
+        edges.append((d * L + i) * L + j)
+        position[axis] += steps
+    return np.concatenate(edges)
+
+
+@lru_cache(maxsize=None)
+def _decoding_graph(L, kind):
+    """
+    Node-edge incidence of the decoding graph
+
+    Returns:
+    tuple: (edge_nodes, node_edges) as lists; edge e = (d*L + i)*L + j
+    joins nodes edge_nodes[e], node n = i*L + j touches node_edges[n]
+    """
+    d, i, j = np.meshgrid(np.arange(2), np.arange(L), np.arange(L), indexing='ij')
+    edge_nodes = np.empty((2, L, L, 2), dtype=np.int64)
+    for axis, (step_d, (oi, oj)) in enumerate(STEPS[kind]):
+        mask = d == step_d
+        lo_i, lo_j = (i - oi) % L, (j - oj) % L
+        hi_i, hi_j = (lo_i + (axis == 0)) % L, (lo_j + (axis == 1)) % L
+        edge_nodes[mask, 0] = (lo_i * L + lo_j)[mask]
+        edge_nodes[mask, 1] = (hi_i * L + hi_j)[mask]
+    edge_nodes = edge_nodes.reshape(-1, 2)
+
+    node_edges = [[] for _ in range(L * L)]
+    for e, (u, v) in enumerate(edge_nodes.tolist()):
+        node_edges[u].append(e)
+        node_edges[v].append(e)
+    return edge_nodes.tolist(), node_edges
+
+
+def _check_parity(syndromes, kind):
+    """Raise ValueError if any syndrome in a (shots, L, L) stack has odd weight"""
+    odd = np.flatnonzero(np.count_nonzero(syndromes, axis=(1, 2)) & 1)
+    if odd.size:
+        stabilizer = 'plaquette' if kind == 'x' else 'star'
+        raise ValueError(
+            f"Odd-weight {stabilizer} syndrome (shot {odd[0]}): toric code defects come in pairs"
+        )
+
+
+class Decoder:
+    """
+    Common decoder interface
+
+    decode() handles one (L, L) syndrome and decode_batch() a
+    (shots, L, L) stack; both record wall time in self.timings as
+    (n_syndromes, seconds). Subclasses implement _decode() and may
+    override _decode_batch() with a vectorized version.
+
+    On the closed torus every error flips an even number of stars and of
+    plaquettes, so both entry points reject odd-weight syndromes with
+    ValueError; they have no correction.
+    """
+    name = None
+
+    def __init__(self):
+        self.timings = []
+
+    def decode(self, syndrome, kind):
+        """
+        Correction for a single (L, L) syndrome
+
+        Returns:
+        array: (2L, L) uint8 edge flips
+        """
+        syndrome = np.asarray(syndrome, dtype=bool)
+        _check_parity(syndrome[None], kind)
+        start = time.perf_counter()
+        correction = self._decode(syndrome, kind)
+        self.timings.append((1, time.perf_counter() - start))
+        return correction
+
+    def decode_batch(self, syndromes, kind):
+        """
+        Corrections for a (shots, L, L) stack of syndromes
+
+        Returns:
+        array: (shots, 2L, L) uint8 edge flips
+        """
+        syndromes = np.asarray(syndromes, dtype=bool)
+        _check_parity(syndromes, kind)
+        start = time.perf_counter()
+        corrections = self._decode_batch(syndromes, kind)
+        self.timings.append((len(syndromes), time.perf_counter() - start))
+        return corrections
+
+    def _decode(self, syndrome, kind):
+        return self._decode_batch(syndrome[None], kind)[0]
+
+    def _decode_batch(self, syndromes, kind):
+        return np.stack([self._decode(s, kind) for s in syndromes])
+
+    def timing_summary(self):
+        """
+        Decode latency statistics over all recorded calls
+
+        Returns:
+        dict: Number of syndromes decoded, total seconds and mean
+        seconds per syndrome
+        """
+        count = sum(n for n, _ in self.timings)
+        total = sum(t for _, t in self.timings)
+        return {
+            'decoder': self.name,
+            'syndromes': count,
+            'seconds': total,
+            'seconds_per_decode': total / count if count else float('nan')
+        }
+
+
+class GreedyDecoder(Decoder):
+    """
+    Vectorized greedy matching
+
+    Defects are paired in order of increasing torus distance. For each
+    displacement v, every defect p with a partner at p + v is a candidate;
+    runs of candidates along v are thinned to priority local maxima so
+    no defect is used twice. All shots are processed together with
+    np.roll, and shots with no defects left drop out of the batch.
+    """
+    name = 'greedy'
+
+    def __init__(self, seed=0):
+        super().__init__()
+        self.seed = seed
+        self._priorities = {}
+
+    def _priority(self, L):
+        if L not in self._priorities:
+            rng = np.random.default_rng(self.seed)
+            self._priorities[L] = rng.permutation(L * L).reshape(L, L)
+        return self._priorities[L]
+
+    def _match_shift(self, defects, correction, shift, priority, kind):
+        sx, sy = shift
+        forward, backward = (-sx, -sy), (sx, sy)
+        earlier = np.roll(priority, backward, axis=(0, 1)) > priority
+        later = np.roll(priority, forward, axis=(0, 1)) > priority
+        while True:
+            candidates = defects & np.roll(defects, forward, axis=(1, 2))
+            if not candidates.any():
+                return
+            accept = (
+                candidates
+                & ~(np.roll(candidates, backward, axis=(1, 2)) & earlier)
+                & ~(np.roll(candidates, forward, axis=(1, 2)) & later)
+            )
+            defects &= ~(accept | np.roll(accept, backward, axis=(1, 2)))
+            flip_paths(correction, accept, shift, kind)
+
+    def _decode_batch(self, syndromes, kind):
+        shots, L = syndromes.shape[0], syndromes.shape[-1]
+        priority = self._priority(L)
+        correction = np.zeros((shots, 2, L, L), dtype=np.uint8)
+
+        active = np.flatnonzero(syndromes.any(axis=(1, 2)))
+        defects = syndromes[active]
+        local = np.zeros((active.size, 2, L, L), dtype=np.uint8)
+        for shifts in _shifts_by_radius(L):
+            if active.size == 0:
+                break
+            for shift in shifts:
+                self._match_shift(defects, local, shift, priority, kind)
+            correction[active] = local
+            remaining = defects.any(axis=(1, 2))
+            active, defects, local = active[remaining], defects[remaining], local[remaining]
+
+        return correction.reshape(shots, 2 * L, L)
+
+
+class MatchingDecoder(Decoder):
+    """
+    Minimum-weight perfect matching on the torus Manhattan metric
+
+    Defects are matched with networkx.max_weight_matching. With
+    num_neighbours set, each defect is only joined to its nearest
+    neighbours, which keeps the graph sparse at large L; defects left
+    unmatched by the sparse graph are then matched exactly.
+    """
+    name = 'mwpm'
+
+    def __init__(self, num_neighbours=None):
+        super().__init__()
+        self.num_neighbours = num_neighbours
+
+    def _match(self, coords, L, num_neighbours):
+        n = len(coords)
+        delta = np.abs(coords[:, None, :] - coords[None, :, :])
+        distance = np.minimum(delta, L - delta).sum(axis=-1)
+
+        if num_neighbours is None or num_neighbours >= n - 1:
+            u, v = np.triu_indices(n, k=1)
+        else:
+            nearest = np.argsort(distance, axis=1)[:, 1:num_neighbours + 1]
+            u = np.repeat(np.arange(n), num_neighbours)
+            v = nearest.ravel()
+
+        graph = nx.Graph()
+        graph.add_weighted_edges_from(zip(u.tolist(), v.tolist(), (L + 1 - distance[u, v]).tolist()))
+        pairs = [tuple(pair) for pair in nx.max_weight_matching(graph, maxcardinality=True)]
+
+        unmatched = np.setdiff1d(np.arange(n), np.array(pairs, dtype=np.int64).ravel())
+        if unmatched.size:
+            rest = self._match(coords[unmatched], L, None)
+            pairs += [(unmatched[a], unmatched[b]) for a, b in rest]
+        return pairs
+
+    def _decode(self, syndrome, kind):
+        L = syndrome.shape[-1]
+        correction = np.zeros(2 * L * L, dtype=np.uint8)
+        coords = np.argwhere(syndrome)
+        if len(coords):
+            for a, b in self._match(coords, L, self.num_neighbours):
+                shift = torus_displacement(coords[a], coords[b], L)
+                correction[path_edges(L, kind, coords[a], shift)] ^= 1
+        return correction.reshape(2 * L, L)
+
+
+class UnionFindDecoder(Decoder):
+    """
+    Union-find decoder (Delfosse-Nickerson)
+
+    Odd clusters grow by half-edges until every cluster holds an even
+    number of defects; the fully grown edges are then peeled along a
+    spanning forest to produce the correction. Runs in near-linear time
+    in the number of grown edges.
+    """
+    name = 'union_find'
+
+    def _decode(self, syndrome, kind):
+        L = syndrome.shape[-1]
+        edge_nodes, node_edges = _decoding_graph(L, kind)
+        defect = syndrome.ravel().tolist()
+        growth = [0] * len(edge_nodes)
+
+        parent = list(range(L * L))
+        size = [1] * (L * L)
+        parity = defect[:]
+        boundary = {n: [n] for n, is_defect in enumerate(defect) if is_defect}
+        in_cluster = defect[:]
+
+        def find(n):
+            root = n
+            while parent[root] != root:
+                root = parent[root]
+            while parent[n] != root:
+                parent[n], n = root, parent[n]
+            return root
+
+        odd = [r for r in boundary]
+        while odd:
+            fused = []
+            for root in odd:
+                for n in boundary[root]:
+                    for e in node_edges[n]:
+                        if growth[e] < 2:
+                            growth[e] += 1
+                            if growth[e] == 2:
+                                fused.append(e)
+
+            for e in fused:
+                u, v = edge_nodes[e]
+                for n in (u, v):
+                    if not in_cluster[n]:
+                        in_cluster[n] = 1
+                        boundary[n] = [n]
+                ru, rv = find(u), find(v)
+                if ru == rv:
+                    continue
+                if size[ru] < size[rv]:
+                    ru, rv = rv, ru
+                parent[rv] = ru
+                size[ru] += size[rv]
+                parity[ru] ^= parity[rv]
+                boundary[ru] += boundary.pop(rv)
+
+            odd = []
+            for root in list(boundary):
+                boundary[root] = [
+                    n for n in boundary[root]
+                    if any(growth[e] < 2 for e in node_edges[n])
+                ]
+                if parity[root]:
+                    odd.append(root)
+
+        return self._peel(L, defect, growth, edge_nodes, node_edges)
+
+    @staticmethod
+    def _peel(L, defect, growth, edge_nodes, node_edges):
+        correction = np.zeros(2 * L * L, dtype=np.uint8)
+        visited = [0] * (L * L)
+        for seed in range(L * L):
+            if not defect[seed] or visited[seed]:
+                continue
+            visited[seed] = 1
+            order, via = [seed], [-1]
+            for n in order:
+                for e in node_edges[n]:
+                    if growth[e] != 2:
+                        continue
+                    u, v = edge_nodes[e]
+                    other = v if u == n else u
+                    if not visited[other]:
+                        visited[other] = 1
+                        order.append(other)
+                        via.append(e)
+            for n, e in zip(reversed(order), reversed(via)):
+                if e >= 0 and defect[n]:
+                    u, v = edge_nodes[e]
+                    correction[e] ^= 1
+                    defect[n] = 0
+                    defect[v if u == n else u] ^= 1
+        return correction.reshape(2 * L, L)
+
+
+DECODERS = {
+    GreedyDecoder.name: GreedyDecoder,
+    MatchingDecoder.name: MatchingDecoder,
+    UnionFindDecoder.name: UnionFindDecoder,
+}
+
+
+def get_decoder(name, **kwargs):
+    """
+    Instantiate a decoder by name ('greedy', 'mwpm' or 'union_find')
+    """
+    try:
+        return DECODERS[name](**kwargs)
+    except KeyError:
+        raise ValueError(f"Unknown decoder '{name}', expected one of {sorted(DECODERS)}") from None
+
+
+def benchmark_decoders(sizes=(64, 128, 256), p=0.01, trials=10, seed=0, decoders=None):
+    """
+    Per-decode latency of each decoder on i.i.d. X noise
+
+    Parameters:
+    sizes (tuple): Lattice sizes L
+    p (float): Physical error rate
+    trials (int): Syndromes decoded per (decoder, L)
+    seed (int): Seed for np.random.default_rng
+    decoders (dict): name -> Decoder; defaults to union_find, greedy and
+        a 10-neighbour mwpm
+
+    Returns:
+    list: One timing_summary() per (decoder, L), with 'L' added
+    """
+    from toric_stabilizers import lattice_syndromes
+
+    if decoders is None:
+        decoders = {
+            'union_find': UnionFindDecoder(),
+            'greedy': GreedyDecoder(),
+            'mwpm': MatchingDecoder(num_neighbours=10),
+        }
+    rng = np.random.default_rng(seed)
+    results = []
+    for L in sizes:
+        errors = (rng.random((trials, 2 * L, L)) < p).astype(np.uint8)
+        _, syndromes = lattice_syndromes(errors)
+        for name, decoder in decoders.items():
+            decoder.timings = []
+            for syndrome in syndromes:
+                decoder.decode(syndrome, 'x')
+            row = decoder.timing_summary()
+            row['L'] = L
+            results.append(row)
+    return results
+
+
+def main():
+    print("Toric code decode latency:")
+    print(f"{'decoder':>12} {'L':>5} {'ms/decode':>12}")
+    for row in benchmark_decoders():
+        print(f"{row['decoder']:>12} {row['L']:>5} {1e3 * row['seconds_per_decode']:>12.2f}")
+
+if __name__ == "__main__":
+    main()
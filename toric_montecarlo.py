@@ -0,0 +1,146 @@
+"""
+Batched Monte Carlo estimate of toric code logical error rates
+
+Each batch holds (shots, 2L, L) uint8 X and Z error lattices. Errors are
+sampled i.i.d., syndromes extracted with np.roll, decoded, and the two
+non-contractible Wilson loops of each residual read off in one pass.
+
+The default decoder is union-find, whose threshold (about 10%) the
+default sweep up to p = 0.10 can resolve; the vectorized greedy decoder
+fails above about 5%. Union-find decodes shot by shot in Python, though:
+at L = 16 it manages roughly 10^3 shots/s near threshold, about three
+times slower than greedy, so 10^6 shots per point cost some 15-20
+minutes of one core. Spread large sweeps over processes with toric_sweep.
+"""
+import time
+
+import numpy as np
+
+from toric_decoders import get_decoder
+from toric_stabilizers import lattice_syndromes, wilson_loops
+
+
+class ToricMonteCarlo:
+    """
+    Noise-and-decode simulator for one lattice size
+
+    decoder may be a Decoder instance or a name accepted by get_decoder.
+    The default is union-find: the vectorized 'greedy' decoder is much
+    faster but its threshold is only about 5%.
+    """
+
+    def __init__(self, L, decoder='union_find'):
+        self.L = L
+        if isinstance(decoder, str):
+            decoder = get_decoder(decoder)
+        self.decoder = decoder
+
+    def sample_errors(self, rng, shots, p):
+        """
+        i.i.d. flips with probability p on every edge
+
+        Returns:
+        array: (shots, 2L, L) uint8
+        """
+        return (rng.random((shots, 2 * self.L, self.L)) < p).astype(np.uint8)
+
+    def run_batch(self, rng, shots, p_x, p_z=None):
+        """
+        Simulate one batch of shots
+
+        Parameters:
+        rng (np.random.Generator): Random stream
+        shots (int): Number of shots
+        p_x (float): X error probability per qubit
+        p_z (float): Z error probability per qubit (defaults to p_x)
+
+        Returns:
+        dict: Per-shot (shots, 2) Wilson loop flips for both error types
+        and the per-shot failure mask
+        """
+        p_z = p_x if p_z is None else p_z
+        x_errors = self.sample_errors(rng, shots, p_x)
+        z_errors = self.sample_errors(rng, shots, p_z)
+
+        star, plaquette = lattice_syndromes(x_errors, z_errors)
+        x_residual = x_errors ^ self.decoder.decode_batch(plaquette, 'x')
+        z_residual = z_errors ^ self.decoder.decode_batch(star, 'z')
+
+        x_loops = wilson_loops(x_residual, 'x')
+        z_loops = wilson_loops(z_residual, 'z')
+        return {
+            'x_wilson_flips': x_loops,
+            'z_wilson_flips': z_loops,
+            'failures': x_loops.any(axis=1) | z_loops.any(axis=1)
+        }
+
+    def run(self, shots, p_x, p_z=None, seed=None, batch_size=10000):
+        """
+        Estimate the logical error rate over many shots
+
+        Parameters:
+        shots (int): Total number of shots
+        p_x (float): X error probability per qubit
+        p_z (float): Z error probability per qubit (defaults to p_x)
+        seed (int or SeedSequence): Seed for np.random.default_rng
+        batch_size (int): Shots per vectorized batch
+
+        Returns:
+        dict: Failure counts, logical error rate, throughput and the
+        decoder name
+        """
+        rng = np.random.default_rng(seed)
+        failures = x_failures = z_failures = 0
+        start = time.perf_counter()
+        for offset in range(0, shots, batch_size):
+            batch = self.run_batch(rng, min(batch_size, shots - offset), p_x, p_z)
+            failures += int(batch['failures'].sum())
+            x_failures += int(batch['x_wilson_flips'].any(axis=1).sum())
+            z_failures += int(batch['z_wilson_flips'].any(axis=1).sum())
+        elapsed = time.perf_counter() - start
+
+        return {
+            'L': self.L,
+            'decoder': self.decoder.name,
+            'shots': shots,
+            'failures': failures,
+            'x_failures': x_failures,
+            'z_failures': z_failures,
+            'logical_error_rate': failures / shots,
+            'seconds': elapsed,
+            'shots_per_sec': shots / elapsed if elapsed > 0 else float('inf')
+        }
+
+
+def threshold_sweep(sizes=(8, 12, 16), rates=(0.02, 0.04, 0.06, 0.08, 0.10),
+                    shots=10000, seed=0, decoder='union_find', batch_size=10000):
+    """
+    Logical error rate and throughput over a grid of L and p
+
+    Each point draws from its own stream, seeded by
+    SeedSequence(seed, spawn_key=(L, p_index)) as in toric_sweep, so
+    samples are independent across the grid.
+
+    Returns:
+    list: One ToricMonteCarlo.run result per (L, p), with 'p' added
+    """
+    results = []
+    for L in sizes:
+        simulator = ToricMonteCarlo(L, decoder)
+        for k, p in enumerate(rates):
+            stream = np.random.SeedSequence(seed, spawn_key=(L, k))
+            row = simulator.run(shots, p, seed=stream, batch_size=batch_size)
+            row['p'] = p
+            results.append(row)
+    return results
+
+
+def main():
+    print("Toric code threshold sweep:")
+    print(f"{'decoder':>10} {'L':>4} {'p':>6} {'P_L':>10} {'shots/s':>12}")
+    for row in threshold_sweep():
+        print(f"{row['decoder']:>10} {row['L']:>4} {row['p']:>6.3f} {row['logical_error_rate']:>10.5f} "
+              f"{row['shots_per_sec']:>12.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Array-backed stabilizer tables for the L x L toric code
+
+Qubits live on the edges of the periodic square lattice. The edge leaving
+vertex (i, j) in direction d (d=0 along i, d=1 along j) is qubit
+2*(i*L + j) + d, the numbering used by create_toric_code.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+# (di, dj, d) offsets of the four edges touched by each stabilizer
+STAR_OFFSETS = ((0, 0, 0), (0, 0, 1), (-1, 0, 0), (0, -1, 1))
+PLAQUETTE_OFFSETS = ((0, 0, 0), (0, 0, 1), (0, 1, 0), (1, 0, 1))
+
+# Parity of every byte value, used to reduce bit-packed GF(2) products
+_BYTE_PARITY = np.array([bin(b).count('1') & 1 for b in range(256)], dtype=np.uint8)
+
+
+def _edge_indices(L, offsets):
+    """
+    Build the (L*L, 4) int32 table of qubit indices for one stabilizer type
+    """
+    i, j = np.divmod(np.arange(L * L), L)
+    columns = [
+        2 * (((i + di) % L) * L + (j + dj) % L) + d
+        for di, dj, d in offsets
+    ]
+    table = np.ascontiguousarray(np.stack(columns, axis=1), dtype=np.int32)
+    table.flags.writeable = False
+    return table
+
+
+def _pack_rows(indices, n_qubits):
+    """
+    Bit-pack a support table into a GF(2) parity-check matrix
+
+    Rows are written directly in packed form, so the dense
+    (rows, n_qubits) matrix is never materialized.
+    """
+    n_rows = indices.shape[0]
+    packed = np.zeros((n_rows, (n_qubits + 7) // 8), dtype=np.uint8)
+    rows = np.repeat(np.arange(n_rows), indices.shape[1])
+    flat = indices.ravel()
+    bits = (np.uint8(0x80) >> (flat & 7).astype(np.uint8)).astype(np.uint8)
+    np.bitwise_or.at(packed, (rows, flat >> 3), bits)
+    packed.flags.writeable = False
+    return packed
+
+
+class ToricStabilizers:
+    """
+    Compact stabilizer representation of the L x L toric code
+
+    stars and plaquettes are contiguous (L*L, 4) int32 arrays of qubit
+    indices; row v of each belongs to vertex / plaquette v = i*L + j.
+    Star (X-type) checks detect Z errors, plaquette (Z-type) checks
+    detect X errors.
+    """
+
+    def __init__(self, L):
+        self.L = L
+        self.n_qubits = 2 * L * L
+        self.stars = _edge_indices(L, STAR_OFFSETS)
+        self.plaquettes = _edge_indices(L, PLAQUETTE_OFFSETS)
+        self._packed = {}
+
+    def terms(self):
+        """
+        List-of-lists view: star and plaquette of each site, interleaved
+        """
+        return np.stack((self.stars, self.plaquettes), axis=1).reshape(-1, 4).tolist()
+
+    def parity_check_matrices(self):
+        """
+        Bit-packed GF(2) parity-check matrices
+
+        Returns:
+        tuple: (H_star, H_plaquette), each (L*L, ceil(2L^2 / 8)) uint8
+        with bits in np.packbits order. Memory grows as L^4 / 8 bytes,
+        so prefer the index tables for syndrome extraction at large L.
+        """
+        if not self._packed:
+            self._packed['star'] = _pack_rows(self.stars, self.n_qubits)
+            self._packed['plaquette'] = _pack_rows(self.plaquettes, self.n_qubits)
+        return self._packed['star'], self._packed['plaquette']
+
+    @staticmethod
+    def _parity(errors, table):
+        errors = np.asarray(errors, dtype=np.uint8)
+        return (
+            errors[..., table[:, 0]] ^ errors[..., table[:, 1]]
+            ^ errors[..., table[:, 2]] ^ errors[..., table[:, 3]]
+        )
+
+    def syndrome(self, x_errors=None, z_errors=None):
+        """
+        Vectorized syndrome extraction
+
+        Parameters:
+        x_errors (array): (..., 2L^2) 0/1 array of X flips, or None
+        z_errors (array): (..., 2L^2) 0/1 array of Z flips, or None
+
+        Returns:
+        tuple: (star_syndrome, plaquette_syndrome), each (..., L*L) uint8,
+        or None for an error type that was not given
+        """
+        star = None if z_errors is None else self._parity(z_errors, self.stars)
+        plaquette = None if x_errors is None else self._parity(x_errors, self.plaquettes)
+        return star, plaquette
+
+    def packed_syndrome(self, packed_x=None, packed_z=None):
+        """
+        Syndrome of bit-packed error vectors via the packed check matrices
+
+        Parameters:
+        packed_x (array): (..., ceil(2L^2 / 8)) np.packbits X flips, or None
+        packed_z (array): (..., ceil(2L^2 / 8)) np.packbits Z flips, or None
+
+        Returns:
+        tuple: (star_syndrome, plaquette_syndrome) as in syndrome()
+        """
+        H_star, H_plaquette = self.parity_check_matrices()
+
+        def reduce(packed, H):
+            if packed is None:
+                return None
+            packed = np.asarray(packed, dtype=np.uint8)[..., None, :]
+            return _BYTE_PARITY[np.bitwise_xor.reduce(packed & H, axis=-1)]
+
+        return reduce(packed_z, H_star), reduce(packed_x, H_plaquette)
+
+
+@lru_cache(maxsize=16)
+def stabilizer_tables(L):
+    """
+    Shared, read-only ToricStabilizers instance for lattice size L
+    """
+    return ToricStabilizers(L)
+
+
+def to_lattice(flat, L):
+    """
+    Reshape (..., 2L^2) qubit vectors into the (..., 2L, L) edge lattice
+
+    Rows 0..L-1 hold the d=0 edges of each vertex, rows L..2L-1 the d=1
+    edges, so lattice[..., d*L + i, j] is qubit 2*(i*L + j) + d.
+    """
+    flat = np.asarray(flat)
+    lattice = np.moveaxis(flat.reshape(flat.shape[:-1] + (L, L, 2)), -1, -3)
+    return lattice.reshape(flat.shape[:-1] + (2 * L, L))
+
+
+def to_flat(lattice):
+    """
+    Inverse of to_lattice
+    """
+    lattice = np.asarray(lattice)
+    L = lattice.shape[-1]
+    split = lattice.reshape(lattice.shape[:-2] + (2, L, L))
+    return np.moveaxis(split, -3, -1).reshape(lattice.shape[:-2] + (2 * L * L,))
+
+
+def lattice_syndromes(x_lattice=None, z_lattice=None):
+    """
+    Vectorized syndrome extraction in the (..., 2L, L) lattice layout
+
+    Returns:
+    tuple: (star_syndrome, plaquette_syndrome), each (..., L, L) uint8
+    indexed by vertex / plaquette (i, j), or None if not requested
+    """
+    star = plaquette = None
+    if z_lattice is not None:
+        L = z_lattice.shape[-1]
+        z0, z1 = z_lattice[..., :L, :], z_lattice[..., L:, :]
+        star = z0 ^ z1 ^ np.roll(z0, 1, axis=-2) ^ np.roll(z1, 1, axis=-1)
+    if x_lattice is not None:
+        L = x_lattice.shape[-1]
+        x0, x1 = x_lattice[..., :L, :], x_lattice[..., L:, :]
+        plaquette = x0 ^ x1 ^ np.roll(x0, -1, axis=-1) ^ np.roll(x1, -1, axis=-2)
+    return star, plaquette
+
+
+def wilson_loops(lattice, kind):
+    """
+    Both non-contractible Wilson loops of a closed error chain
+
+    Parameters:
+    lattice (array): (..., 2L, L) residual X (kind='x') or Z (kind='z')
+        flips with trivial syndrome
+    kind (str): 'x' or 'z'
+
+    Returns:
+    array: (..., 2) uint8 parities; 1 means the loop reads -1, i.e. the
+    chain wraps the torus along that cycle
+    """
+    L = lattice.shape[-1]
+    e0, e1 = lattice[..., :L, :], lattice[..., L:, :]
+    if kind == 'x':
+        loops = (e0[..., :, 0], e1[..., 0, :])
+    elif kind == 'z':
+        loops = (e1[..., :, 0], e0[..., 0, :])
+    else:
+        raise ValueError(f"Unknown error kind: {kind}")
+    return np.stack([np.bitwise_xor.reduce(loop, axis=-1) for loop in loops], axis=-1)
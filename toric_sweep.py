@@ -0,0 +1,269 @@
+"""
+Process-parallel threshold sweeps for the toric code
+
+Work is split into (L, p, block) units of block_shots shots each and
+farmed out to a ProcessPoolExecutor. Every unit draws from its own
+numpy Generator seeded by SeedSequence(seed, spawn_key=(L, p_index,
+block)), so results do not depend on worker count or scheduling.
+Failure counts are merged in block order as units complete, and a point
+stops at the first block prefix whose Wilson confidence interval is tight
+enough, so the final counts are reproducible too. A finished point sets a
+flag in shared memory; its queued units are cancelled and units already
+handed to a worker return at their next batch without simulating.
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from math import sqrt
+from multiprocessing.sharedctypes import RawArray
+from statistics import NormalDist
+
+import numpy as np
+
+from toric_montecarlo import ToricMonteCarlo
+
+# Per-process simulators, reused across work units
+_SIMULATORS = {}
+# Per-point stop flags shared with the parent, set by _init_worker
+_STOPPED = None
+
+
+def _init_worker(stopped):
+    global _STOPPED
+    _STOPPED = stopped
+
+
+def _run_block(L, p, p_index, block, seed, shots, decoder, batch_size, slot):
+    """
+    Worker entry point: simulate one (L, p, block) unit, or return early
+    once the point in flag slot has stopped (the result is then unused)
+    """
+    key = (L, decoder)
+    if key not in _SIMULATORS:
+        _SIMULATORS[key] = ToricMonteCarlo(L, decoder)
+    simulator = _SIMULATORS[key]
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(L, p_index, block)))
+    failures = done = 0
+    for offset in range(0, shots, batch_size):
+        if _STOPPED is not None and _STOPPED[slot]:
+            break
+        batch = simulator.run_batch(rng, min(batch_size, shots - offset), p)
+        failures += int(batch['failures'].sum())
+        done += len(batch['failures'])
+    return L, p_index, block, done, failures
+
+
+def wilson_interval(failures, shots, confidence=0.95):
+    """
+    Wilson score interval for a binomial failure rate
+
+    Returns:
+    tuple: (low, high)
+    """
+    if shots == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    rate = failures / shots
+    denom = 1 + z**2 / shots
+    centre = (rate + z**2 / (2 * shots)) / denom
+    half = z * sqrt(rate * (1 - rate) / shots + z**2 / (4 * shots**2)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class SweepPoint:
+    """
+    Streaming failure count for one (L, p)
+    """
+
+    def __init__(self, L, p, p_index):
+        self.L = L
+        self.p = p
+        self.p_index = p_index
+        self.shots = 0
+        self.failures = 0
+        self.next_block = 0
+        self.merged_blocks = 0
+        self.in_flight = 0
+        self.done = False
+        self._buffer = {}
+
+    def add(self, block, shots, failures, stop):
+        """
+        Record a finished unit and merge every contiguous block since the
+        last merge, checking stop() after each; returns True if anything
+        was merged
+        """
+        self.in_flight -= 1
+        self._buffer[block] = (shots, failures)
+        merged = False
+        while not self.done and self.merged_blocks in self._buffer:
+            shots, failures = self._buffer.pop(self.merged_blocks)
+            self.shots += shots
+            self.failures += failures
+            self.merged_blocks += 1
+            self.done = stop(self)
+            merged = True
+        return merged
+
+    def converged(self, rel_precision, confidence, min_failures):
+        if self.failures < min_failures:
+            return False
+        low, high = wilson_interval(self.failures, self.shots, confidence)
+        return (high - low) / 2 <= rel_precision * self.failures / self.shots
+
+    def summary(self, confidence):
+        low, high = wilson_interval(self.failures, self.shots, confidence)
+        return {
+            'L': self.L,
+            'p': self.p,
+            'shots': self.shots,
+            'failures': self.failures,
+            'logical_error_rate': self.failures / self.shots if self.shots else float('nan'),
+            'ci_low': low,
+            'ci_high': high,
+            'done': self.done
+        }
+
+
+def iter_sweep(sizes, rates, decoder='union_find', seed=0, block_shots=2000, max_shots=10**6,
+               rel_precision=0.1, confidence=0.95, min_failures=10, max_workers=None,
+               batch_size=2000):
+    """
+    Run a sweep, yielding each point's running summary as units complete
+
+    Parameters:
+    sizes (iterable): Lattice sizes L
+    rates (iterable): Physical error rates p
+    decoder (str): Decoder name for get_decoder
+    seed (int): Root seed of all per-unit streams
+    block_shots (int): Shots per work unit
+    max_shots (int): Shot budget per point
+    rel_precision (float): Stop a point once the CI half-width is below
+        this fraction of its logical error rate
+    confidence (float): Confidence level of the Wilson interval
+    min_failures (int): Failures required before a point may stop
+    max_workers (int): Worker processes (defaults to os.cpu_count())
+    batch_size (int): Shots per vectorized batch inside a worker
+
+    Yields:
+    dict: SweepPoint.summary() of the point that just received a result,
+    with the decoder name added
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    points = [SweepPoint(L, p, k) for L in sizes for k, p in enumerate(rates)]
+    lookup = {(point.L, point.p_index): point for point in points}
+    slots = {point: n for n, point in enumerate(points)}
+    stopped = RawArray('b', len(points))
+    max_blocks = -(-max_shots // block_shots)
+
+    def wants_more(point):
+        return not point.done and point.next_block < max_blocks
+
+    def stop(point):
+        return (point.merged_blocks >= max_blocks
+                or point.converged(rel_precision, confidence, min_failures))
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(stopped,)) as pool:
+        pending = set()
+        owners = {}
+
+        def submit(point):
+            future = pool.submit(
+                _run_block, point.L, point.p, point.p_index, point.next_block,
+                seed, block_shots, decoder, batch_size, slots[point]
+            )
+            pending.add(future)
+            owners[future] = point
+            point.next_block += 1
+            point.in_flight += 1
+
+        def cancel(point):
+            # Drop queued units of a finished point; units a worker already
+            # holds see the flag and return early, and SweepPoint.add
+            # ignores them
+            stopped[slots[point]] = 1
+            for future in [f for f in pending if owners[f] is point]:
+                if future.cancel():
+                    pending.discard(future)
+                    del owners[future]
+                    point.in_flight -= 1
+
+        def fill():
+            # Round-robin over open points, keeping two units per worker queued
+            while len(pending) < 2 * max_workers:
+                open_points = [point for point in points if wants_more(point)]
+                if not open_points:
+                    return
+                for point in sorted(open_points, key=lambda pt: pt.in_flight):
+                    if len(pending) >= 2 * max_workers:
+                        return
+                    submit(point)
+
+        fill()
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                del owners[future]
+                L, p_index, block, shots, failures = future.result()
+                point = lookup[(L, p_index)]
+                if point.add(block, shots, failures, stop):
+                    if point.done:
+                        cancel(point)
+                    yield dict(point.summary(confidence), decoder=decoder)
+            fill()
+
+
+def run_sweep(sizes, rates, **kwargs):
+    """
+    Run a sweep to completion
+
+    Takes the same arguments as iter_sweep.
+
+    Returns:
+    list: Final summary per (L, p), ordered by L then p
+    """
+    final = {}
+    for summary in iter_sweep(sizes, rates, **kwargs):
+        final[(summary['L'], summary['p'])] = summary
+    return [final[key] for key in sorted(final)]
+
+
+def scaling_benchmark(worker_counts=(1, 2, 4, 8), L=16, p=0.05, shots=64000, block_shots=2000,
+                      decoder='union_find'):
+    """
+    Shots per second of a fixed-size sweep at several worker counts
+
+    Early stopping is disabled so every run does the same work.
+
+    Returns:
+    list: dicts with 'workers', 'seconds', 'shots_per_sec' and 'speedup'
+    """
+    results = []
+    for workers in worker_counts:
+        start = time.perf_counter()
+        run_sweep([L], [p], decoder=decoder, block_shots=block_shots, max_shots=shots,
+                  rel_precision=0.0, max_workers=workers)
+        elapsed = time.perf_counter() - start
+        results.append({'workers': workers, 'seconds': elapsed, 'shots_per_sec': shots / elapsed})
+    for row in results:
+        row['speedup'] = row['shots_per_sec'] / results[0]['shots_per_sec']
+    return results
+
+
+def main():
+    print("Parallel toric code threshold sweep:")
+    print(f"{'decoder':>10} {'L':>4} {'p':>6} {'shots':>9} {'P_L':>10} {'95% CI':>22}")
+    for row in run_sweep((8, 12, 16), (0.04, 0.06, 0.08, 0.10), max_shots=200000):
+        print(f"{row['decoder']:>10} {row['L']:>4} {row['p']:>6.3f} {row['shots']:>9} {row['logical_error_rate']:>10.5f} "
+              f"  [{row['ci_low']:.5f}, {row['ci_high']:.5f}]")
+
+    print("\nScaling:")
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    for row in scaling_benchmark(counts):
+        print(f"{row['workers']:>4} workers: {row['shots_per_sec']:>10.0f} shots/s "
+              f"(x{row['speedup']:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Stabilizer-tableau simulation of the toric code
+
+StabilizerTableau follows Aaronson & Gottesman (2004): 2n rows of
+bit-packed uint64 X and Z words (destabilizers, then stabilizers) and a
+sign bit per row, so memory is O(n^2 / 32) bytes instead of O(2^n).
+The dense_* functions implement the same operations on a statevector
+for tiny lattices, so the two backends can be cross-checked.
+"""
+import numpy as np
+
+from toric_decoders import path_edges, torus_displacement
+from toric_stabilizers import stabilizer_tables, to_flat
+
+_BYTE_POPCOUNT = np.array([bin(b).count('1') for b in range(256)], dtype=np.uint8)
+
+
+def _popcount(words):
+    """
+    Per-row popcount of (..., W) uint64 words
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def pack_qubits(qubits, n):
+    """
+    Bit-pack a collection of qubit indices into (ceil(n / 64),) uint64 words
+    """
+    words = np.zeros((n + 63) // 64, dtype=np.uint64)
+    qubits = np.asarray(qubits, dtype=np.int64)
+    np.bitwise_or.at(words, qubits >> 6, np.left_shift(np.uint64(1), (qubits & 63).astype(np.uint64)))
+    return words
+
+
+class StabilizerTableau:
+    """
+    Bit-packed Clifford stabilizer state on n qubits, initialized to |0...0>
+
+    Rows 0..n-1 of x, z (each (2n, ceil(n/64)) uint64) are destabilizers,
+    rows n..2n-1 stabilizers; r holds the sign bit of each row.
+    """
+
+    def __init__(self, n, seed=None):
+        self.n = n
+        self.words = (n + 63) // 64
+        self.x = np.zeros((2 * n, self.words), dtype=np.uint64)
+        self.z = np.zeros((2 * n, self.words), dtype=np.uint64)
+        self.r = np.zeros(2 * n, dtype=np.uint8)
+        rows = np.arange(n)
+        bits = np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64))
+        self.x[rows, rows >> 6] = bits
+        self.z[n + rows, rows >> 6] = bits
+        self.rng = np.random.default_rng(seed)
+
+    def _column(self, table, q):
+        return ((table[:, q >> 6] >> np.uint64(q & 63)) & np.uint64(1)).astype(np.uint8)
+
+    def _set_column(self, table, q, values):
+        bit = np.uint64(1) << np.uint64(q & 63)
+        word = table[:, q >> 6] & ~bit
+        table[:, q >> 6] = word | (values.astype(np.uint64) << np.uint64(q & 63))
+
+    def h(self, q):
+        """Hadamard on qubit q"""
+        xq, zq = self._column(self.x, q), self._column(self.z, q)
+        self.r ^= xq & zq
+        self._set_column(self.x, q, zq)
+        self._set_column(self.z, q, xq)
+
+    def s(self, q):
+        """Phase gate on qubit q"""
+        xq, zq = self._column(self.x, q), self._column(self.z, q)
+        self.r ^= xq & zq
+        self._set_column(self.z, q, zq ^ xq)
+
+    def cnot(self, control, target):
+        """CNOT from control to target"""
+        xc, zc = self._column(self.x, control), self._column(self.z, control)
+        xt, zt = self._column(self.x, target), self._column(self.z, target)
+        self.r ^= xc & zt & (xt ^ zc ^ 1)
+        self._set_column(self.x, target, xt ^ xc)
+        self._set_column(self.z, control, zc ^ zt)
+
+    def apply_pauli(self, x_words, z_words):
+        """
+        Apply the Pauli operator with packed X / Z support
+
+        Rows anticommuting with it change sign.
+        """
+        anti = (_popcount((self.x & z_words) ^ (self.z & x_words)) & 1).astype(np.uint8)
+        self.r ^= anti
+
+    def _rowsum(self, targets, x_src, z_src, r_src):
+        """
+        Multiply rows `targets` by the Pauli (x_src, z_src, r_src) in place
+        """
+        x1, z1 = x_src[None, :], z_src[None, :]
+        x2, z2 = self.x[targets], self.z[targets]
+        X1, Z1, Y1 = x1 & ~z1, z1 & ~x1, x1 & z1
+        plus = (X1 & z2 & x2) | (Z1 & x2 & ~z2) | (Y1 & z2 & ~x2)
+        minus = (X1 & z2 & ~x2) | (Z1 & x2 & z2) | (Y1 & x2 & ~z2)
+        phase = 2 * self.r[targets].astype(np.int64) + 2 * int(r_src) + _popcount(plus) - _popcount(minus)
+        self.r[targets] = ((phase % 4) == 2).astype(np.uint8)
+        self.x[targets] = x2 ^ x1
+        self.z[targets] = z2 ^ z1
+
+    def measure_pauli(self, x_words, z_words, postselect=None):
+        """
+        Measure a Hermitian Pauli product
+
+        Parameters:
+        x_words (array): Packed X support
+        z_words (array): Packed Z support (qubits in both carry Y)
+        postselect (int): Force a random outcome to 0 (+1) or 1 (-1)
+
+        Returns:
+        tuple: (outcome bit, deterministic flag)
+        """
+        n = self.n
+        anti = (_popcount((self.x & z_words) ^ (self.z & x_words)) & 1).astype(bool)
+        stab_anti = np.flatnonzero(anti[n:]) + n
+
+        if stab_anti.size:
+            p = stab_anti[0]
+            others = np.flatnonzero(anti)
+            others = others[others != p]
+            if others.size:
+                self._rowsum(others, self.x[p], self.z[p], self.r[p])
+            self.x[p - n], self.z[p - n], self.r[p - n] = self.x[p], self.z[p], self.r[p]
+            outcome = int(self.rng.integers(2)) if postselect is None else int(postselect)
+            self.x[p], self.z[p] = x_words, z_words
+            self.r[p] = outcome
+            return outcome, False
+
+        outcome = self._deterministic_outcome(anti)
+        if postselect is not None and outcome != postselect:
+            raise ValueError("Cannot postselect a deterministic measurement on the other outcome")
+        return outcome, True
+
+    def _deterministic_outcome(self, anti):
+        # P is the product of the stabilizers whose destabilizers anticommute with it
+        n = self.n
+        acc_x = np.zeros(self.words, dtype=np.uint64)
+        acc_z = np.zeros(self.words, dtype=np.uint64)
+        acc_r = 0
+        for row in np.flatnonzero(anti[:n]) + n:
+            acc_r = self._product_phase(acc_x, acc_z, acc_r, self.x[row], self.z[row], self.r[row])
+            acc_x ^= self.x[row]
+            acc_z ^= self.z[row]
+        return acc_r
+
+    def expectation(self, x_words, z_words):
+        """
+        Expectation value of a Hermitian Pauli product, without measuring
+
+        Returns:
+        int: +1 or -1 if the outcome is deterministic, otherwise 0
+        """
+        anti = (_popcount((self.x & z_words) ^ (self.z & x_words)) & 1).astype(bool)
+        if anti[self.n:].any():
+            return 0
+        return 1 - 2 * self._deterministic_outcome(anti)
+
+    @staticmethod
+    def _product_phase(x2, z2, r2, x1, z1, r1):
+        X1, Z1, Y1 = x1 & ~z1, z1 & ~x1, x1 & z1
+        plus = (X1 & z2 & x2) | (Z1 & x2 & ~z2) | (Y1 & z2 & ~x2)
+        minus = (X1 & z2 & ~x2) | (Z1 & x2 & z2) | (Y1 & x2 & ~z2)
+        phase = 2 * int(r2) + 2 * int(r1) + int(_popcount(plus[None])[0]) - int(_popcount(minus[None])[0])
+        return int((phase % 4) == 2)
+
+
+class ToricTableau:
+    """
+    Toric code ground state and anyon strings on a StabilizerTableau
+
+    The ground state is prepared from |0...0>, which already satisfies
+    every plaquette and both Z-type logicals, by measuring each star with
+    its outcome postselected to +1.
+    """
+
+    def __init__(self, L, seed=None):
+        self.L = L
+        self.n = 2 * L * L
+        self.tableau = StabilizerTableau(self.n, seed)
+        self._zero = np.zeros(self.tableau.words, dtype=np.uint64)
+        for star in stabilizer_tables(L).stars:
+            self.tableau.measure_pauli(pack_qubits(star, self.n), self._zero, postselect=0)
+
+    def _lattice_qubits(self, edges):
+        lattice = np.zeros(2 * self.L * self.L, dtype=np.uint8)
+        lattice[edges] ^= 1
+        return np.flatnonzero(to_flat(lattice.reshape(2 * self.L, self.L)))
+
+    def apply_string(self, kind, start, end):
+        """
+        Apply an X (kind='x', between plaquettes) or Z (kind='z', between
+        vertices) string along a shortest path
+        """
+        edges = path_edges(self.L, kind, start, torus_displacement(start, end, self.L))
+        words = pack_qubits(self._lattice_qubits(edges), self.n)
+        if kind == 'x':
+            self.tableau.apply_pauli(words, self._zero)
+        else:
+            self.tableau.apply_pauli(self._zero, words)
+
+    def measure_stabilizers(self):
+        """
+        Eigenvalue bits of every star and plaquette
+
+        Returns:
+        tuple: (star, plaquette) (L*L,) uint8 arrays, 1 marking an anyon
+        """
+        tables = stabilizer_tables(self.L)
+        star = [self.tableau.expectation(pack_qubits(s, self.n), self._zero) for s in tables.stars]
+        plaquette = [self.tableau.expectation(self._zero, pack_qubits(p, self.n)) for p in tables.plaquettes]
+        return (np.array(star) < 0).astype(np.uint8), (np.array(plaquette) < 0).astype(np.uint8)
+
+    def wilson_loops(self):
+        """
+        Expectation values of the four non-contractible Wilson loops
+
+        Returns:
+        dict: Z loops ('z_i', 'z_j') and X loops ('x_i', 'x_j') along the
+        i and j cycles; +/-1 in a definite sector, 0 if the state is in a
+        superposition of sectors for that loop
+        """
+        results = {}
+        for name, qubits in wilson_loop_supports(self.L).items():
+            words = pack_qubits(qubits, self.n)
+            x_words, z_words = (words, self._zero) if name[0] == 'x' else (self._zero, words)
+            results[name] = self.tableau.expectation(x_words, z_words)
+        return results
+
+
+def wilson_loop_supports(L):
+    """
+    Qubit indices of the non-contractible Z and X loops
+
+    Z loops commute with every star and X loops with every plaquette;
+    they read the X- and Z-chain parities of toric_stabilizers.wilson_loops.
+    """
+    i = np.arange(L)
+    return {
+        'z_i': 2 * (i * L) + 0,
+        'z_j': 2 * i + 1,
+        'x_i': 2 * (i * L) + 1,
+        'x_j': 2 * i + 0,
+    }
+
+
+def _dense_apply(state, qubits, kind):
+    """
+    Apply X or Z on the given qubits of a dense statevector
+    """
+    mask = int(np.bitwise_or.reduce(np.left_shift(1, np.asarray(qubits, dtype=np.int64))))
+    basis = np.arange(state.size, dtype=np.int64)
+    if kind == 'x':
+        return state[basis ^ mask]
+    parity = np.zeros(state.size, dtype=np.int64)
+    for q in qubits:
+        parity ^= (basis >> int(q)) & 1
+    return state * (1 - 2 * parity)
+
+
+def dense_ground_state(L):
+    """
+    Toric code ground state as a 2^(2L^2) statevector (tiny L only)
+
+    Projects |0...0> with prod_s (1 + A_s) / 2 and normalizes.
+    """
+    n = 2 * L * L
+    state = np.zeros(2**n)
+    state[0] = 1.0
+    for star in stabilizer_tables(L).stars:
+        state = 0.5 * (state + _dense_apply(state, star, 'x'))
+    return state / np.linalg.norm(state)
+
+
+def dense_apply_string(state, L, kind, start, end):
+    """
+    Dense counterpart of ToricTableau.apply_string
+    """
+    edges = path_edges(L, kind, start, torus_displacement(start, end, L))
+    lattice = np.zeros(2 * L * L, dtype=np.uint8)
+    lattice[edges] ^= 1
+    qubits = np.flatnonzero(to_flat(lattice.reshape(2 * L, L)))
+    return _dense_apply(state, qubits, kind)
+
+
+def dense_wilson_loops(state, L):
+    """
+    Dense counterpart of ToricTableau.wilson_loops (expectation values)
+    """
+    return {
+        name: float(np.real(np.vdot(state, _dense_apply(state, qubits, name[0]))))
+        for name, qubits in wilson_loop_supports(L).items()
+    }
+
+
+def cross_check(L=2, strings=((('x', (0, 0), (1, 0))),), seed=0):
+    """
+    Compare Wilson loops of the tableau and dense backends
+
+    Returns:
+    tuple: (tableau loops, dense loops) after applying the given
+    (kind, start, end) strings to the ground state
+    """
+    toric = ToricTableau(L, seed)
+    state = dense_ground_state(L)
+    for kind, start, end in strings:
+        toric.apply_string(kind, start, end)
+        state = dense_apply_string(state, L, kind, start, end)
+    return toric.wilson_loops(), dense_wilson_loops(state, L)
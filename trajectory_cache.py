@@ -0,0 +1,269 @@
+"""
+Two-level cache for rocket trajectory results
+
+Results are nested dicts of scalars and NumPy arrays, as returned by
+CosmicMotionAnalysis.rocket_trajectory_calculation. They are keyed by
+a hash of the parameters and rocket_dynamics.MODEL_VERSION (functions
+by their code, defaults and closure values; calls with parameters that
+have no deterministic key skip the cache), kept in an in-memory LRU,
+and written to disk as one directory per entry: every array is a
+separate .npy file, so a reload memory-maps it instead of reading it,
+and the scalars go to meta.json. Values that are neither arrays nor
+JSON (the dense 'solution' of the ODE model) live only in memory; a
+result reloaded from disk has them set to None. Both levels are size
+bounded, with least recently used entries evicted first.
+"""
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import types
+from collections import OrderedDict
+
+import numpy as np
+
+from rocket_dynamics import MODEL_VERSION
+
+DEFAULT_DIRECTORY = os.environ.get(
+    'COSMIC_MOTION_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'cosmic_motion')
+)
+
+
+# meta.json entry listing the values that were not stored
+_DROPPED = '__dropped__'
+
+
+def _code_key(code):
+    """Digest of a code object's bytecode, constants and names"""
+    consts = tuple(_code_key(c) if isinstance(c, types.CodeType) else repr(c) for c in code.co_consts)
+    text = repr((code.co_code, consts, code.co_names, code.co_varnames, code.co_freevars))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _key_part(value):
+    """
+    Deterministic text for one parameter value
+
+    Functions are keyed by their compiled code, defaults and closure
+    values, so two closures or lambdas built with different constants
+    get different keys. Raises TypeError for values without a stable key
+    (e.g. callable instances, whose state is opaque).
+    """
+    if isinstance(value, functools.partial):
+        return ('partial', _key_part(value.func), _key_part(value.args), _key_part(value.keywords))
+    if isinstance(value, types.MethodType):
+        return ('method', _key_part(value.__func__), _key_part(value.__self__))
+    if isinstance(value, types.FunctionType):
+        closure = tuple(cell.cell_contents for cell in value.__closure__ or ())
+        return ('function', value.__module__, value.__qualname__,
+                _code_key(value.__code__),
+                _key_part(value.__defaults__), _key_part(value.__kwdefaults__), _key_part(closure))
+    if isinstance(value, (types.BuiltinFunctionType, np.ufunc)):
+        # Stateless module-level functions (np.exp, math.sqrt, ...)
+        return ('builtin', getattr(value, '__module__', None) or '', value.__name__)
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(_key_part(item) for item in value)
+    if isinstance(value, dict):
+        return ('dict',) + tuple(sorted((repr(name), _key_part(item)) for name, item in value.items()))
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(value.tobytes()).hexdigest() + str(value.dtype) + str(value.shape)
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes)):
+        return repr(value)
+    raise TypeError(f"No deterministic cache key for {type(value).__name__} values")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError
+
+
+class TrajectoryCache:
+    """
+    LRU plus on-disk cache of trajectory results
+
+    Parameters:
+    directory (str): Disk cache location, or None for memory only
+    max_entries (int): Entries kept in memory
+    max_bytes (int): Disk budget; oldest entries are deleted beyond it
+    version: Model version mixed into every key
+    """
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_entries=32,
+                 max_bytes=256 * 2**20, version=MODEL_VERSION):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = version
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def key(self, params):
+        """
+        Hex digest of the model version and a parameter dict
+
+        Raises TypeError when a value has no deterministic key.
+        """
+        text = repr((self.version, sorted((name, _key_part(v)) for name, v in params.items())))
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
+    def get(self, params):
+        """Cached result for params, or None"""
+        key = self.key(params)
+        if key in self._memory:
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        result = self._load(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, result)
+        return result
+
+    def put(self, params, result):
+        """Store result (arrays are made read-only) under params"""
+        key = self.key(params)
+        _freeze(result)
+        self._remember(key, result)
+        if self.directory is not None:
+            self._store(key, result)
+            self._evict_disk()
+        return result
+
+    def get_or_compute(self, params, compute):
+        """
+        Cached result, or compute() stored under params
+
+        Parameters that cannot be keyed deterministically bypass the
+        cache: the result is computed and not stored.
+        """
+        try:
+            self.key(params)
+        except TypeError:
+            self.bypassed += 1
+            return compute()
+        result = self.get(params)
+        if result is None:
+            result = self.put(params, compute())
+        return result
+
+    def stats(self):
+        """Hit/miss counters and current sizes"""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed,
+            'memory_entries': len(self._memory),
+            'disk_bytes': self._disk_usage()[1],
+        }
+
+    def clear(self, disk=False):
+        self._memory.clear()
+        if disk and self.directory is not None and os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _store(self, key, result):
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, key)
+        if os.path.isdir(target):
+            return
+        staging = tempfile.mkdtemp(dir=self.directory, prefix='.tmp-')
+        meta = {}
+        dropped = []
+        for path, value in _flatten(result):
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(staging, '.'.join(path) + '.npy'), value)
+            else:
+                try:
+                    meta['.'.join(path)] = json.loads(json.dumps(value, default=_json_default))
+                except TypeError:
+                    dropped.append('.'.join(path))
+        meta[_DROPPED] = dropped
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, 'meta.json')) as f:
+                flat = json.load(f)
+            # Values that could not be stored come back as None, so a disk
+            # hit has the same keys as the result that was stored
+            flat.update(dict.fromkeys(flat.pop(_DROPPED, ())))
+            for name in os.listdir(entry):
+                if name.endswith('.npy'):
+                    flat[name[:-4]] = np.load(os.path.join(entry, name), mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        os.utime(entry)
+        return _unflatten(flat)
+
+    def _disk_usage(self):
+        """(mtime, bytes, path) per entry and the total size"""
+        if self.directory is None or not os.path.isdir(self.directory):
+            return [], 0
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            entries.append((os.path.getmtime(path), size, path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict_disk(self):
+        entries, total = self._disk_usage()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+def _flatten(value, path=()):
+    if isinstance(value, dict):
+        for name, item in value.items():
+            yield from _flatten(item, path + (str(name),))
+    else:
+        yield path, value
+
+
+def _unflatten(flat):
+    result = {}
+    for dotted, value in flat.items():
+        *parents, leaf = dotted.split('.')
+        node = result
+        for name in parents:
+            node = node.setdefault(name, {})
+        node[leaf] = value
+    return result
+
+
+def _freeze(result):
+    for _, value in _flatten(result):
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False